@@ -0,0 +1,106 @@
+import math
+import random
+import time
+
+# 重なり1マスあたりのペナルティ (行/列の過不足1マス分を1とする)
+OVERLAP_WEIGHT = 2
+
+
+def _cells(mask):
+    cells = []
+    i = 0
+    while mask:
+        if mask & 1:
+            cells.append(i)
+        mask >>= 1
+        i += 1
+    return tuple(cells)
+
+
+def search(n, placement_options, obstacle_mask, x_counts, y_counts, xans, yans,
+           time_limit=10.0, seed=None, t_start=2.0, t_end=0.05):
+    # 焼きなまし法. 状態は各ピースの option 番号, コストは行/列の目標との差の合計 + 重なり
+    # returns (best_choices, violation, overlap, moves): violation == overlap == 0 なら厳密解
+    rng = random.Random(seed)
+    num_pieces = len(placement_options)
+    targets = list(xans) + list(yans)
+    counts = list(x_counts) + list(y_counts)
+    if num_pieces == 0:
+        # 動かせるピースが無いので初期盤面のまま
+        return [], sum(abs(c - t) for c, t in zip(counts, targets)), 0, 0
+    col_line = [i % n for i in range(n * n)]
+    row_line = [n + i // n for i in range(n * n)]
+    opt_cells = [[_cells(opt['mask']) for opt in options] for options in placement_options]
+
+    # 初期解: ランダムな順に, 重ならない option があればそれを選ぶ
+    cover = [0] * (n * n)
+    assign = [0] * num_pieces
+    occupied = obstacle_mask
+    for p in rng.sample(range(num_pieces), num_pieces):
+        free = [k for k, opt in enumerate(placement_options[p]) if not (occupied & opt['mask'])]
+        assign[p] = rng.choice(free) if free else rng.randrange(len(placement_options[p]))
+        occupied |= placement_options[p][assign[p]]['mask']
+        for i in opt_cells[p][assign[p]]:
+            cover[i] += 1
+            counts[col_line[i]] += 1
+            counts[row_line[i]] += 1
+    overlap = sum(c - 1 for c in cover if c > 1)
+    violation = sum(abs(c - t) for c, t in zip(counts, targets))
+
+    def move(p, new):
+        # ピース p を option new に付け替え, (重なりの増減, 違反の増減) を返す
+        d_overlap = 0
+        d_violation = 0
+        for i in opt_cells[p][assign[p]]:
+            cover[i] -= 1
+            if cover[i] >= 1:
+                d_overlap -= 1
+            for line in (col_line[i], row_line[i]):
+                c = counts[line]
+                t = targets[line]
+                d_violation += (1 if c <= t else -1)
+                counts[line] = c - 1
+        for i in opt_cells[p][new]:
+            if cover[i] >= 1:
+                d_overlap += 1
+            cover[i] += 1
+            for line in (col_line[i], row_line[i]):
+                c = counts[line]
+                t = targets[line]
+                d_violation += (1 if c >= t else -1)
+                counts[line] = c + 1
+        assign[p] = new
+        return d_overlap, d_violation
+
+    best = (overlap, violation)
+    best_assign = assign[:]
+    moves = 0
+    start = time.perf_counter()
+    temperature = t_start
+    cooling = math.log(t_end / t_start)
+    while best != (0, 0):
+        # 時刻の確認と温度の更新は 1000 手ごと
+        if moves % 1000 == 0:
+            elapsed = time.perf_counter() - start
+            if elapsed >= time_limit:
+                break
+            temperature = t_start * math.exp(cooling * elapsed / time_limit)
+        moves += 1
+        p = rng.randrange(num_pieces)
+        old = assign[p]
+        new = rng.randrange(len(opt_cells[p]))
+        if new == old:
+            continue
+        d_overlap, d_violation = move(p, new)
+        delta = OVERLAP_WEIGHT * d_overlap + d_violation
+        if delta <= 0 or rng.random() < math.exp(-delta / temperature):
+            overlap += d_overlap
+            violation += d_violation
+            if (overlap, violation) < best:
+                best = (overlap, violation)
+                best_assign = assign[:]
+        else:
+            move(p, old)
+
+    choices = [placement_options[p][k] for p, k in enumerate(best_assign)]
+    return choices, best[1], best[0], moves
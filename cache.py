@@ -0,0 +1,182 @@
+import hashlib
+import json
+import sqlite3
+import time
+
+# 盤面 (r, c) に対する8通りの対称変換
+# m = n - 1 を渡すと盤面の座標変換, m = 0 で線形部分 (ピース形状用) になる
+SYMMETRIES = [
+    lambda r, c, m: (r, c),
+    lambda r, c, m: (c, m - r),
+    lambda r, c, m: (m - r, m - c),
+    lambda r, c, m: (m - c, r),
+    lambda r, c, m: (r, m - c),
+    lambda r, c, m: (m - r, c),
+    lambda r, c, m: (c, r),
+    lambda r, c, m: (m - c, m - r),
+]
+
+
+def canonical_shape(cells):
+    # 回転4通りの中で最小の正規化済み形状 (Material.rotate は回転のみなので鏡像は区別する)
+    best = None
+    for _ in range(4):
+        cells = [(c, -r) for r, c in cells]
+        min_r = min(r for r, c in cells)
+        min_c = min(c for r, c in cells)
+        shape = tuple(sorted((r - min_r, c - min_c) for r, c in cells))
+        if best is None or shape < best:
+            best = shape
+    return best
+
+
+def _transform(sym, n, board, xans, yans, mats):
+    m = n - 1
+    new_board = [[0] * n for _ in range(n)]
+    for r in range(n):
+        for c in range(n):
+            nr, nc = sym(r, c, m)
+            new_board[nr][nc] = board[r][c]
+
+    # 行/列がどこに移るかで目標値を並べ替える (転置系は行と列が入れ替わる)
+    new_x = [0] * n
+    new_y = [0] * n
+    for i in range(n):
+        a, b = sym(i, 0, m), sym(i, 1, m)
+        if a[0] == b[0]:
+            new_y[a[0]] = yans[i]
+        else:
+            new_x[a[1]] = yans[i]
+        a, b = sym(0, i, m), sym(1, i, m)
+        if a[1] == b[1]:
+            new_x[a[1]] = xans[i]
+        else:
+            new_y[a[0]] = xans[i]
+
+    # ピースは (x, y) -> (r, c) = (-y, x) の向きに直してから変換する
+    shapes = [canonical_shape([sym(-y, x, 0) for x, y in mat.positions]) for mat in mats]
+    return new_board, new_x, new_y, shapes
+
+
+def canonicalize(board, xans, yans, mats):
+    # 8対称のうち辞書順最小の表現を選ぶ
+    # returns (key, sym_index, shapes): shapes は選んだ向きでの各ピースの正規形
+    n = len(board)
+    best = None
+    for sym_idx, sym in enumerate(SYMMETRIES):
+        new_board, new_x, new_y, shapes = _transform(sym, n, board, xans, yans, mats)
+        rep = (n, tuple(map(tuple, new_board)), tuple(new_x), tuple(new_y), tuple(sorted(shapes)))
+        if best is None or rep < best[0]:
+            best = (rep, sym_idx, shapes)
+    rep, sym_idx, shapes = best
+    key = hashlib.sha256(repr(rep).encode()).hexdigest()
+    return key, sym_idx, shapes
+
+
+def _piece_ranks(shapes):
+    # 正規形の昇順 (同形は出現順) で各ピースに順位を付ける
+    order = sorted(range(len(shapes)), key=lambda i: (shapes[i], i))
+    ranks = [0] * len(shapes)
+    for rank, i in enumerate(order):
+        ranks[i] = rank
+    return ranks
+
+
+class SolutionCache:
+    # Table.eval の前段に置く SQLite のキャッシュ
+    # 回転/鏡映した盤面は同じキーになり, 解は呼び出し側の向きに戻して返す
+    def __init__(self, path='solutions.sqlite', max_entries=100000):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.db = sqlite3.connect(path)
+        self.db.execute('''CREATE TABLE IF NOT EXISTS solutions (
+            key TEXT PRIMARY KEY,
+            solution TEXT,
+            last_used REAL NOT NULL)''')
+        self.db.execute('CREATE INDEX IF NOT EXISTS solutions_last_used ON solutions(last_used)')
+        self.db.execute('CREATE TABLE IF NOT EXISTS stats (name TEXT PRIMARY KEY, value INTEGER NOT NULL)')
+        self.db.commit()
+
+    def close(self):
+        self.db.close()
+
+    def __len__(self):
+        return self.db.execute('SELECT COUNT(*) FROM solutions').fetchone()[0]
+
+    def _bump(self, name):
+        self.db.execute('INSERT INTO stats VALUES (?, 1) ON CONFLICT(name) DO UPDATE SET value = value + 1',
+                        (name,))
+
+    def lookup(self, board, xans, yans, mats):
+        # returns (hit, solution): solution は呼び出し側の向き/ラベルの盤面, 解なしなら None
+        key, sym_idx, shapes = canonicalize(board, xans, yans, mats)
+        row = self.db.execute('SELECT solution FROM solutions WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            self._bump('misses')
+            self.db.commit()
+            return False, None
+
+        self.hits += 1
+        self._bump('hits')
+        self.db.execute('UPDATE solutions SET last_used = ? WHERE key = ?', (time.time(), key))
+        self.db.commit()
+        if row[0] is None:
+            return True, None
+
+        # 正規向きの盤面を逆変換し, 順位ラベルを呼び出し側のピース番号に戻す
+        stored = json.loads(row[0])
+        n = len(board)
+        ranks = _piece_ranks(shapes)
+        rank_to_label = {rank + 2: i + 2 for i, rank in enumerate(ranks)}
+        sym = SYMMETRIES[sym_idx]
+        solution = [[0] * n for _ in range(n)]
+        for r in range(n):
+            for c in range(n):
+                nr, nc = sym(r, c, n - 1)
+                val = stored[nr][nc]
+                solution[r][c] = rank_to_label[val] if val >= 2 and board[r][c] == 0 else val
+        return True, solution
+
+    def store(self, board, xans, yans, mats, solution):
+        # solution=None で「解なし」も記録する
+        key, sym_idx, shapes = canonicalize(board, xans, yans, mats)
+        data = None
+        if solution is not None:
+            n = len(board)
+            ranks = _piece_ranks(shapes)
+            sym = SYMMETRIES[sym_idx]
+            canonical = [[0] * n for _ in range(n)]
+            for r in range(n):
+                for c in range(n):
+                    nr, nc = sym(r, c, n - 1)
+                    val = solution[r][c]
+                    canonical[nr][nc] = ranks[val - 2] + 2 if val >= 2 and board[r][c] == 0 else val
+            data = json.dumps(canonical)
+        self.db.execute('INSERT OR REPLACE INTO solutions VALUES (?, ?, ?)', (key, data, time.time()))
+        self._evict()
+        self.db.commit()
+
+    def _evict(self):
+        # 件数が上限を超えたら最後に使われたのが古いものから消す
+        excess = len(self) - self.max_entries
+        if excess > 0:
+            self.db.execute('''DELETE FROM solutions WHERE key IN (
+                SELECT key FROM solutions ORDER BY last_used LIMIT ?)''', (excess,))
+            self._bump('evictions')
+
+    def stats(self):
+        total = dict(self.db.execute('SELECT name, value FROM stats').fetchall())
+        hits, misses = total.get('hits', 0), total.get('misses', 0)
+        return {
+            'entries': len(self),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / (self.hits + self.misses) if self.hits + self.misses else 0.0,
+            'total_hits': hits,
+            'total_misses': misses,
+            'total_hit_rate': hits / (hits + misses) if hits + misses else 0.0,
+            'evictions': total.get('evictions', 0),
+        }
@@ -0,0 +1,102 @@
+import math
+import random
+import time
+
+# 探索木の大きさの見積もり (Knuth の乱択プローブ)
+# 根からランダムに1本の道を下り, 各深さで「制約を満たす子の数」c_d を数えると
+# 1 + c_0 + c_0*c_1 + ... が Table._search_python の全探索ノード数の不偏推定になる.
+# 解が見つかった時点で探索は止まるので, 解のある問題では上限の見積もりになる
+
+# 実行時間の見積もりに使う最低プローブ数 (浅い段の計測が揃うように)
+MIN_PROBES = 16
+
+
+def _probe(n, placement_options, obstacle_mask, x_counts, y_counts, xans, yans, rng, weights, costs, visits):
+    # returns このプローブでの推定ノード数
+    # weights[d] には深さ d のノード数の推定値を, costs[d] / visits[d] には深さ d のノード展開にかかった
+    # 時間と回数を足し込む
+    mask = obstacle_mask
+    xs = list(x_counts)
+    ys = list(y_counts)
+    total = 1
+    weight = 1
+    for d, options in enumerate(placement_options):
+        # 子の判定は Table._search_python のループと同じ書き方にして, 1ノードあたりの時間を揃える
+        start = time.perf_counter()
+        children = []
+        for opt in options:
+            if mask & opt['mask']:
+                continue
+            next_x = xs[:]
+            valid = True
+            for i in range(n):
+                next_x[i] += opt['x_adds'][i]
+                if next_x[i] > xans[i]:
+                    valid = False; break
+            if not valid: continue
+            next_y = ys[:]
+            for i in range(n):
+                next_y[i] += opt['y_adds'][i]
+                if next_y[i] > yans[i]:
+                    valid = False; break
+            if not valid: continue
+            children.append((opt, next_x, next_y))
+        weights[d] += weight
+        costs[d] += time.perf_counter() - start
+        visits[d] += 1
+        if not children:
+            break
+        weight *= len(children)
+        total += weight
+        opt, xs, ys = rng.choice(children)
+        mask |= opt['mask']
+    return total
+
+
+def estimate(n, placement_options, obstacle_mask, x_counts, y_counts, xans, yans,
+             time_limit=0.3, max_probes=100000, seed=None):
+    # time_limit 秒 (か max_probes 本) プローブして平均を取る
+    # returns {'nodes': 推定ノード数, 'error': その標準誤差, 'seconds': 推定実行時間 (python エンジン),
+    #          'probes': プローブ数}
+    rng = random.Random(seed)
+    num_pieces = len(placement_options)
+    weights = [0] * num_pieces
+    costs = [0.0] * num_pieces
+    visits = [0] * num_pieces
+    start = time.perf_counter()
+    count = 0
+    mean = 0.0
+    m2 = 0.0
+    while count < max_probes:
+        nodes = _probe(n, placement_options, obstacle_mask, x_counts, y_counts, xans, yans, rng,
+                       weights, costs, visits)
+        # 平均と分散は逐次更新 (値の桁が大きく振れるので Welford 法)
+        count += 1
+        delta = nodes - mean
+        mean += delta / count
+        m2 += delta * (nodes - mean)
+        if count >= MIN_PROBES and time.perf_counter() - start >= time_limit:
+            break
+    error = math.sqrt(m2 / (count - 1) / count) if count > 1 else float('inf')
+    # 実行時間 = 深さごとの (推定ノード数 x 1ノードの展開時間) の合計
+    seconds = sum(weights[d] / count * costs[d] / visits[d] for d in range(num_pieces) if visits[d])
+    return {
+        'nodes': mean,
+        'error': error,
+        'seconds': seconds,
+        'probes': count,
+    }
+
+
+def progress(cursor, orders, depth, max_depth=4):
+    # 探索中の進み具合 (0..1). 浅い段で何番目の枝にいるかから, 済んだ部分木の割合を足し合わせる
+    # (どの枝も同じ大きさだと仮定したときの値)
+    fraction = 0.0
+    scale = 1.0
+    for d in range(min(depth, max_depth)):
+        width = len(orders[d])
+        if width == 0:
+            break
+        fraction += scale * (cursor[d] - 1) / width
+        scale /= width
+    return fraction
@@ -0,0 +1,56 @@
+from main import Table
+
+
+def analyze(board, xans, yans, mats):
+    # Solve を押す前の軽いチェック (board は上の行から, yans も上の行から)
+    # returns {'ok': bool, 'messages': [...], 'lines': {'x0', 'y2', ...}}
+    # lines は GUI の constraint_buttons のキーに合わせた, 問題のある行/列
+    n = len(board)
+    messages = []
+    lines = set()
+
+    fixed_x = [0] * n
+    fixed_y = [0] * n
+    free_x = [0] * n
+    free_y = [0] * n
+    for r in range(n):
+        for c in range(n):
+            val = board[r][c]
+            if val > 0:
+                fixed_x[c] += 1
+                fixed_y[r] += 1
+            elif val == 0:
+                free_x[c] += 1
+                free_y[r] += 1
+
+    # 合計の整合性 (Table.eval の Sum Mismatch と同じ条件)
+    blocks = sum(mats) + sum(fixed_x)
+    if sum(xans) != sum(yans) or sum(xans) != blocks:
+        messages.append(f"Sum mismatch. X:{sum(xans)} Y:{sum(yans)} Blocks:{blocks}")
+
+    # 行/列ごと: 既に埋まっている数 <= 目標 <= 埋まっている数 + 空きマス
+    for kind, targets, fixed, free in (('x', xans, fixed_x, free_x), ('y', yans, fixed_y, free_y)):
+        for i in range(n):
+            if fixed[i] > targets[i]:
+                lines.add(f'{kind}{i}')
+                messages.append(f"{kind.upper()}{i}: initial board already has {fixed[i]} > {targets[i]}")
+            elif targets[i] > fixed[i] + free[i]:
+                lines.add(f'{kind}{i}')
+                messages.append(f"{kind.upper()}{i}: target {targets[i]} exceeds available cells {fixed[i] + free[i]}")
+
+    # 各ピースに, 空きマスだけを使い行/列の目標を超えない置き方が1つはあるか
+    # (置き方は Table.eval と同じ Table._generate_options から取る)
+    table = Table(board)
+    for mat_idx, mat in enumerate(mats):
+        if not _has_option(table, mat, xans, yans, fixed_x, fixed_y):
+            messages.append(f"Material {mat_idx} cannot be placed.")
+
+    return {'ok': not messages, 'messages': messages, 'lines': lines}
+
+
+def _has_option(table, mat, xans, yans, fixed_x, fixed_y):
+    for opt in table._generate_options(mat):
+        if (all(fixed_x[c] + k <= xans[c] for c, k in enumerate(opt['x_adds'])) and
+                all(fixed_y[r] + k <= yans[r] for r, k in enumerate(opt['y_adds']))):
+            return True
+    return False
@@ -2,6 +2,8 @@ import tkinter as tk
 from tkinter import ttk, messagebox, scrolledtext
 import sys
 import io
+import queue
+import threading
 from contextlib import redirect_stdout
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 from matplotlib.figure import Figure
@@ -9,6 +11,7 @@ import matplotlib.pyplot as plt
 
 # Import from main.py
 from main import Table, Material
+from feasibility import analyze
 
 
 class PentominoPuzzleGUI:
@@ -24,6 +27,7 @@ class PentominoPuzzleGUI:
         self.yans = []  # Y constraints
         self.initial_board = []  # Initial board state
         self.solution_board = None  # Solution board
+        self.last_placements = None  # Previous solution, reused as a warm-start hint
         self.mode = tk.StringVar(value='edit')  # 'edit' or 'result'
         
         # Grid buttons
@@ -32,6 +36,12 @@ class PentominoPuzzleGUI:
         
         self.canvas_widget = None
         
+        # Live feasibility check (debounced, runs on a worker thread)
+        self.feasibility_job = None
+        self.feasibility_generation = 0
+        self.feasibility_shown = 0
+        self.feasibility_results = queue.Queue()
+        
         self.setup_ui()
         self.update_board_size()
         
@@ -124,6 +134,9 @@ class PentominoPuzzleGUI:
         self.grid_button_frame = ttk.Frame(container)
         self.grid_button_frame.pack(side=tk.BOTTOM, anchor=tk.E, padx=10, pady=5)
         
+        self.feasibility_label = ttk.Label(self.grid_button_frame, text="")
+        self.feasibility_label.pack(side=tk.LEFT, padx=5)
+        
         ttk.Button(self.grid_button_frame, text="Reset All", 
                   command=self.reset_all).pack(side=tk.LEFT, padx=5)
     
@@ -193,6 +206,7 @@ class PentominoPuzzleGUI:
                 self.grid_buttons[(r, c)] = cell_btn
         
         self.update_grid_display()
+        self.schedule_feasibility_check()
     
     def setup_size_events(self):
         """Setup interactive events for size button"""
@@ -254,6 +268,7 @@ class PentominoPuzzleGUI:
             new_val = max(0, min(constraints[index] + delta, max_val))
             constraints[index] = new_val
             button.config(text=str(new_val))
+            self.schedule_feasibility_check()
         
         button.bind('<MouseWheel>', on_wheel)
         
@@ -272,6 +287,7 @@ class PentominoPuzzleGUI:
                 new_val = max(0, min(drag_data['start_val'] + steps, max_val))
                 constraints[index] = new_val
                 button.config(text=str(new_val))
+                self.schedule_feasibility_check()
         
         def on_drag_end(event):
             # Restore color
@@ -285,12 +301,15 @@ class PentominoPuzzleGUI:
                 new_val = min(constraints[index] + 1, max_val)
                 constraints[index] = new_val
                 button.config(text=str(new_val))
+            # Re-check so the restored color is replaced by the red highlight if needed
+            self.schedule_feasibility_check()
         
         # Right-click to decrement
         def on_right_click(event):
             new_val = max(constraints[index] - 1, 0)
             constraints[index] = new_val
             button.config(text=str(new_val))
+            self.schedule_feasibility_check()
         
         button.bind('<Button-1>', on_drag_start)
         button.bind('<B1-Motion>', on_drag_motion)
@@ -304,6 +323,7 @@ class PentominoPuzzleGUI:
             new_val = 1 if current == 0 else (-1 if current == 1 else 0)
             self.initial_board[row][col] = new_val
             self.update_cell_display(row, col)
+            self.schedule_feasibility_check()
     
     def update_cell_display(self, row, col):
         button = self.grid_buttons[(row, col)]
@@ -419,6 +439,62 @@ class PentominoPuzzleGUI:
         self.mat_listbox.delete(0, tk.END)
         for i, mat in enumerate(self.materials):
             self.mat_listbox.insert(tk.END, f"Mat{i}: {len(mat.positions)} cells")
+        self.schedule_feasibility_check()
+    
+    def schedule_feasibility_check(self):
+        """Re-run the feasibility analyzer shortly after the last edit"""
+        if self.feasibility_job is not None:
+            self.root.after_cancel(self.feasibility_job)
+        self.feasibility_job = self.root.after(150, self.start_feasibility_check)
+    
+    def start_feasibility_check(self):
+        """Analyze a snapshot of the puzzle on a worker thread"""
+        self.feasibility_job = None
+        self.feasibility_generation += 1
+        generation = self.feasibility_generation
+        snapshot = ([row[:] for row in self.initial_board], self.xans[:], self.yans[:], list(self.materials))
+        
+        def worker():
+            # Always post a result, otherwise poll_feasibility keeps re-arming forever
+            try:
+                result = analyze(*snapshot)
+            except Exception as e:
+                result = {'ok': False, 'messages': [str(e) or type(e).__name__], 'lines': set()}
+            self.feasibility_results.put((generation, result))
+        
+        threading.Thread(target=worker, daemon=True).start()
+        self.root.after(10, self.poll_feasibility)
+    
+    def poll_feasibility(self):
+        """Pick up the latest analysis result; older ones are discarded"""
+        current = None
+        while True:
+            try:
+                generation, result = self.feasibility_results.get_nowait()
+            except queue.Empty:
+                break
+            if generation == self.feasibility_generation:
+                current = result
+        if current is not None:
+            self.feasibility_shown = self.feasibility_generation
+            self.show_feasibility(current)
+        elif self.feasibility_shown != self.feasibility_generation and self.feasibility_job is None:
+            self.root.after(10, self.poll_feasibility)
+    
+    def show_feasibility(self, result):
+        for key, button in self.constraint_buttons.items():
+            if key in result['lines']:
+                button.config(bg='#FFCDD2')
+            else:
+                button.config(bg='#E3F2FD' if key.startswith('x') else '#E8F5E9')
+        
+        if result['ok']:
+            self.feasibility_label.config(text="Feasible", foreground='#388E3C')
+        else:
+            text = result['messages'][0]
+            if len(result['messages']) > 1:
+                text += f" (+{len(result['messages']) - 1} more)"
+            self.feasibility_label.config(text=text, foreground='#D32F2F')
     
     def load_example(self):
         self.table_size.set(5)
@@ -507,14 +583,16 @@ class PentominoPuzzleGUI:
         
         try:
             with redirect_stdout(log_stream):
-                result = table.eval(self.xans.copy(), self.yans.copy(), self.materials)
+                result = table.eval(self.xans.copy(), self.yans.copy(), self.materials,
+                                    hint=self.last_placements)
             
             # Display log
             self.log_text.insert(tk.END, log_stream.getvalue())
             self.log_text.see(tk.END)
             
             if result:
-                self.solution_board = result.internal
+                self.solution_board = result.tolist()
+                self.last_placements = result.placements
                 self.mode.set('result')
                 self.update_grid_display()
                 messagebox.showinfo("Success", "Solution found!")
@@ -0,0 +1,100 @@
+import numpy as np
+
+# numba があれば探索カーネルを JIT コンパイルする. なければ同じ関数をそのまま Python で実行する
+try:
+    from numba import njit
+    HAVE_NUMBA = True
+except ImportError:
+    HAVE_NUMBA = False
+
+    def njit(*args, **kwargs):
+        return lambda f: f
+
+
+def pack_options(n, placement_options):
+    # placement_options をフラットな配列にまとめる
+    # starts[i]:starts[i+1] がピース i の option, masks は 64bit ワード列, adds は [x_adds, y_adds]
+    words = (n * n + 63) // 64
+    total = sum(len(options) for options in placement_options)
+    starts = np.zeros(len(placement_options) + 1, dtype=np.int64)
+    masks = np.zeros((total, words), dtype=np.uint64)
+    adds = np.zeros((total, 2 * n), dtype=np.int8)
+    j = 0
+    for idx, options in enumerate(placement_options):
+        starts[idx] = j
+        for opt in options:
+            masks[j] = split_mask(opt['mask'], words)
+            adds[j, :n] = opt['x_adds']
+            adds[j, n:] = opt['y_adds']
+            j += 1
+    starts[len(placement_options)] = j
+    return starts, masks, adds
+
+
+def split_mask(mask, words):
+    return np.array([(mask >> (64 * w)) & 0xFFFFFFFFFFFFFFFF for w in range(words)], dtype=np.uint64)
+
+
+@njit(cache=True)
+def _dfs(starts, masks, adds, init_mask, init_counts, targets, choice):
+    # 再帰版 (Table._search_python) と同じ順序で辿る反復DFS
+    # 見つかれば choice[i] にピース i の option 番号 (ピース内) を書く. returns (found, iterations)
+    num_pieces = starts.shape[0] - 1
+    words = masks.shape[1]
+    width = adds.shape[1]
+    mask_stack = np.empty((num_pieces + 1, words), dtype=np.uint64)
+    count_stack = np.empty((num_pieces + 1, width), dtype=np.int32)
+    cursor = np.empty(num_pieces + 1, dtype=np.int64)
+    mask_stack[0] = init_mask
+    count_stack[0] = init_counts
+
+    iterations = 1
+    if num_pieces == 0:
+        return True, iterations
+    depth = 0
+    cursor[0] = starts[0]
+    while depth >= 0:
+        j = cursor[depth]
+        if j == starts[depth + 1]:
+            depth -= 1
+            continue
+        cursor[depth] = j + 1
+
+        ok = True
+        for w in range(words):
+            if mask_stack[depth, w] & masks[j, w]:
+                ok = False
+                break
+        if not ok:
+            continue
+        for i in range(width):
+            if count_stack[depth, i] + adds[j, i] > targets[i]:
+                ok = False
+                break
+        if not ok:
+            continue
+
+        choice[depth] = j - starts[depth]
+        for w in range(words):
+            mask_stack[depth + 1, w] = mask_stack[depth, w] | masks[j, w]
+        for i in range(width):
+            count_stack[depth + 1, i] = count_stack[depth, i] + adds[j, i]
+        depth += 1
+        iterations += 1
+        if depth == num_pieces:
+            return True, iterations
+        cursor[depth] = starts[depth]
+    return False, iterations
+
+
+def search(n, placement_options, obstacle_mask, x_counts, y_counts, xans, yans):
+    # Table._search_python と同じ戻り値 (solution_history or None, iterations)
+    starts, masks, adds = pack_options(n, placement_options)
+    init_mask = split_mask(obstacle_mask, masks.shape[1])
+    init_counts = np.array(list(x_counts) + list(y_counts), dtype=np.int32)
+    targets = np.array(list(xans) + list(yans), dtype=np.int32)
+    choice = np.zeros(len(placement_options), dtype=np.int64)
+    found, iterations = _dfs(starts, masks, adds, init_mask, init_counts, targets, choice)
+    if not found:
+        return None, int(iterations)
+    return [placement_options[i][int(choice[i])] for i in range(len(placement_options))], int(iterations)
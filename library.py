@@ -0,0 +1,187 @@
+import argparse
+import json
+import mmap
+import struct
+
+import numpy as np
+
+# 配置表ライブラリ
+# 標準的なピース形状ごと/盤面サイズごとに, 障害物なしの全配置をバイナリファイルに書いておき,
+# 求解時は mmap して切り出すだけにする (障害物はその場でマスクする)
+#
+# ファイル形式: MAGIC, uint32 (索引JSONの長さ), 索引JSON, レコード列
+# 索引: {"n:形状キー": [オフセット, 件数]}. 形状キーは左下を (0, 0) に正規化した (x, y) の列
+# レコード (盤面サイズ n ごとに固定長): mask (uint64 x words), adds (int8 x 2n: x_adds, y_adds),
+# anchor (int8 x 2: 正規化形状の左下を置く dx, dy). 配置は (dy, dx) の昇順
+
+MAGIC = b'PENTLIB1'
+
+PENTOMINOES = {
+    'F': [(1, 0), (1, 1), (2, 1), (0, 2), (1, 2)],
+    'I': [(0, 0), (0, 1), (0, 2), (0, 3), (0, 4)],
+    'L': [(0, 0), (1, 0), (0, 1), (0, 2), (0, 3)],
+    'N': [(0, 0), (0, 1), (1, 1), (1, 2), (1, 3)],
+    'P': [(0, 0), (0, 1), (1, 1), (0, 2), (1, 2)],
+    'T': [(1, 0), (1, 1), (0, 2), (1, 2), (2, 2)],
+    'U': [(0, 0), (1, 0), (2, 0), (0, 1), (2, 1)],
+    'V': [(0, 0), (1, 0), (2, 0), (0, 1), (0, 2)],
+    'W': [(0, 0), (1, 0), (1, 1), (2, 1), (2, 2)],
+    'X': [(1, 0), (0, 1), (1, 1), (2, 1), (1, 2)],
+    'Y': [(0, 0), (0, 1), (1, 1), (0, 2), (0, 3)],
+    'Z': [(0, 0), (1, 0), (1, 1), (1, 2), (2, 2)],
+}
+
+TETROMINOES = {
+    'I4': [(0, 0), (0, 1), (0, 2), (0, 3)],
+    'O4': [(0, 0), (1, 0), (0, 1), (1, 1)],
+    'T4': [(0, 0), (1, 0), (2, 0), (1, 1)],
+    'L4': [(0, 0), (1, 0), (0, 1), (0, 2)],
+    'S4': [(0, 0), (1, 0), (1, 1), (2, 1)],
+}
+
+SIZES = range(5, 16)
+
+
+def normalize(positions):
+    # 左下を (0, 0) に寄せた形状キーと, 寄せた量 (min_x, min_y)
+    min_x = min(x for x, y in positions)
+    min_y = min(y for x, y in positions)
+    return tuple(sorted((x - min_x, y - min_y) for x, y in positions)), min_x, min_y
+
+
+def shape_keys(shapes):
+    # 各形状の回転と鏡像 (Material.rotate は回転のみなので片面ずつ別の形状になる)
+    keys = set()
+    for positions in shapes:
+        for cells in (positions, [(-x, y) for x, y in positions]):
+            for _ in range(4):
+                cells = [(y, -x) for x, y in cells]
+                keys.add(normalize(cells)[0])
+    return sorted(keys)
+
+
+def record_dtype(n):
+    words = (n * n + 63) // 64
+    return np.dtype([('mask', '<u8', (words,)), ('adds', 'i1', (2 * n,)), ('anchor', 'i1', (2,))])
+
+
+def _records(n, key):
+    width = max(x for x, y in key) + 1
+    height = max(y for x, y in key) + 1
+    words = (n * n + 63) // 64
+    records = np.zeros(max(0, n - height + 1) * max(0, n - width + 1), dtype=record_dtype(n))
+    i = 0
+    for dy in range(n - height + 1):
+        for dx in range(n - width + 1):
+            mask = 0
+            for px, py in key:
+                r = n - (py + dy) - 1
+                c = px + dx
+                mask |= 1 << (r * n + c)
+                records[i]['adds'][c] += 1
+                records[i]['adds'][n + r] += 1
+            records[i]['mask'] = [(mask >> (64 * w)) & 0xFFFFFFFFFFFFFFFF for w in range(words)]
+            records[i]['anchor'] = (dx, dy)
+            i += 1
+    return records
+
+
+def build(path, shapes=None, sizes=SIZES):
+    # オフラインのビルド手順: 全形状 x 全サイズの配置表をファイルに書く
+    if shapes is None:
+        shapes = list(PENTOMINOES.values()) + list(TETROMINOES.values())
+    keys = shape_keys(shapes)
+    chunks = []
+    index = {}
+    offset = 0
+    for n in sizes:
+        for key in keys:
+            records = _records(n, key)
+            index[f"{n}:{json.dumps(key)}"] = [offset, len(records)]
+            chunks.append(records.tobytes())
+            offset += records.nbytes
+    header = json.dumps(index).encode()
+    with open(path, 'wb') as f:
+        f.write(MAGIC)
+        f.write(struct.pack('<I', len(header)))
+        f.write(header)
+        for chunk in chunks:
+            f.write(chunk)
+    print(f"Wrote {len(index)} placement tables ({len(keys)} shapes, sizes {sizes.start}-{sizes.stop - 1}) to {path}")
+
+
+class PlacementLibrary:
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, 'rb')
+        self.mm = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.mm[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a placement library")
+        (length,) = struct.unpack_from('<I', self.mm, len(MAGIC))
+        start = len(MAGIC) + 4
+        self.index = json.loads(self.mm[start:start + length])
+        self.base = start + length
+        self.decoded = {}
+
+    def close(self):
+        self.mm.close()
+        self.file.close()
+
+    def records(self, n, key):
+        # ファイル上のレコード列をそのまま参照する (コピーなし). 無ければ None
+        entry = self.index.get(f"{n}:{json.dumps(key)}")
+        if entry is None:
+            return None
+        offset, count = entry
+        return np.frombuffer(self.mm, dtype=record_dtype(n), count=count, offset=self.base + offset)
+
+    def placement_options(self, n, mat, obstacle_mask):
+        # Table.placement_options と同じ並びの option リスト. ライブラリに無い形状なら None
+        # 障害物の判定は mmap 上のレコードに対してまとめて行い, 残ったものだけ option にする
+        words = (n * n + 63) // 64
+        obstacle = np.array([(obstacle_mask >> (64 * w)) & 0xFFFFFFFFFFFFFFFF for w in range(words)],
+                            dtype=np.uint64)
+        options = []
+        for rot_idx in range(4):
+            key, min_x, min_y = normalize(mat.rotate(rot_idx).positions)
+            records = self.records(n, key)
+            if records is None:
+                return None
+            # Table と同じく dx, dy (回転後の座標に足す量) が 0..n-1 の配置だけ
+            dx = records['anchor'][:, 0].astype(np.intp) - min_x
+            dy = records['anchor'][:, 1].astype(np.intp) - min_y
+            keep = (dx >= 0) & (dx < n) & (dy >= 0) & (dy < n) & ~(records['mask'] & obstacle).any(axis=1)
+            decoded = self._decode(n, key, records, rot_idx, min_x, min_y)
+            options.extend(decoded[i] for i in np.flatnonzero(keep).tolist())
+        return options
+
+    def _decode(self, n, key, records, rot_idx, min_x, min_y):
+        # option の dict 化は一度だけ (solver は option を書き換えないので使い回せる)
+        cache_key = (n, key, rot_idx, min_x, min_y)
+        decoded = self.decoded.get(cache_key)
+        if decoded is None:
+            # レコード単位で numpy スカラーを触ると遅いので, 列ごとにまとめて Python の値にする
+            size = records.dtype['mask'].itemsize
+            mask_bytes = records['mask'].tobytes()
+            x_adds = records['adds'][:, :n].tolist()
+            y_adds = records['adds'][:, n:].tolist()
+            anchors = records['anchor'].tolist()
+            decoded = [{
+                'mask': int.from_bytes(mask_bytes[i * size:(i + 1) * size], 'little'),
+                'x_adds': x_adds[i],
+                'y_adds': y_adds[i],
+                'rot': rot_idx,
+                'dx': ax - min_x,
+                'dy': ay - min_y,
+            } for i, (ax, ay) in enumerate(anchors)]
+            self.decoded[cache_key] = decoded
+        return decoded
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build a precomputed placement library")
+    parser.add_argument('path')
+    parser.add_argument('--min-size', type=int, default=SIZES.start)
+    parser.add_argument('--max-size', type=int, default=SIZES.stop - 1)
+    args = parser.parse_args()
+    build(args.path, sizes=range(args.min_size, args.max_size + 1))
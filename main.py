@@ -1,48 +1,217 @@
-import itertools, copy
+import itertools, math, os, json, hashlib, signal, threading, time
+from array import array
+from collections.abc import MutableSequence, Sequence
 import matplotlib.pyplot as plt
 import matplotlib.colors as mcolors
 import numpy as np
 
+class _RowView(MutableSequence):
+    # internal[r][c] 互換の行ビュー. 中身は持たず, 読み出しは常に Table の現在値,
+    # 書き込みは Table.set 経由 (カウンタも更新). 盤面の大きさは変えられない
+    def __init__(self, table, r):
+        self.table = table
+        self.r = r
+
+    def tolist(self):
+        start = self.r * self.table.n
+        return self.table.cells[start:start + self.table.n].tolist()
+
+    def __len__(self):
+        return self.table.n
+
+    def __getitem__(self, c):
+        n = self.table.n
+        if isinstance(c, slice):
+            return self.tolist()[c]
+        if c < 0:
+            c += n
+        if not 0 <= c < n:
+            raise IndexError(c)
+        return self.table.cells[self.r * n + c]
+
+    def __setitem__(self, c, val):
+        n = self.table.n
+        if isinstance(c, slice):
+            cols = range(n)[c]
+            vals = list(val)
+            if len(vals) != len(cols):
+                raise ValueError(f"Cannot resize a board row ({len(vals)} values for {len(cols)} cells)")
+        else:
+            if c < 0:
+                c += n
+            if not 0 <= c < n:
+                raise IndexError(c)
+            cols = [c]
+            vals = [val]
+        for col, v in zip(cols, vals):
+            self.table.set(col, n - self.r - 1, v)
+
+    def __delitem__(self, c):
+        raise ValueError("Cannot resize a board row")
+
+    def insert(self, c, val):
+        raise ValueError("Cannot resize a board row")
+
+    def __iter__(self):
+        return iter(self.tolist())
+
+    def __eq__(self, other):
+        if not isinstance(other, Sequence):
+            return NotImplemented
+        return self.tolist() == list(other)
+
+    def __repr__(self):
+        return repr(self.tolist())
+
+
+class _BoardView(Sequence):
+    # 旧 list of lists (internal) 互換のビュー (各行は _RowView). 中身は持たない.
+    # 本物の list が要る所 (json.dumps など) では Table.tolist() を使う
+    def __init__(self, table):
+        self.table = table
+
+    def tolist(self):
+        return self.table.tolist()
+
+    def __len__(self):
+        return self.table.n
+
+    def __getitem__(self, r):
+        n = self.table.n
+        if isinstance(r, slice):
+            return [_RowView(self.table, i) for i in range(n)[r]]
+        if r < 0:
+            r += n
+        if not 0 <= r < n:
+            raise IndexError(r)
+        return _RowView(self.table, r)
+
+    def __setitem__(self, r, line):
+        if isinstance(r, slice):
+            for i, values in zip(range(self.table.n)[r], line):
+                self[i] = values
+            return
+        self[r][:] = line
+
+    def __iter__(self):
+        return (_RowView(self.table, r) for r in range(self.table.n))
+
+    def __eq__(self, other):
+        if not isinstance(other, Sequence):
+            return NotImplemented
+        return self.table.tolist() == [list(line) for line in other]
+
+    def __repr__(self):
+        return repr(self.table.tolist())
+
+
 class Table:
+    # 盤面は行優先 (上の行から) の int8 フラットバッファ cells に保持する
+    # bit (r * n + c) が occupied_mask: 正の値のマス / obstacle_mask: 0以外のマス
+    # x_counts[c] / y_counts[r] は正の値のマス数 (r=0 が一番上の行)
     def __init__(self, init):
         if isinstance(init, int):
             self.n = init
-            self.internal = [[0 for _ in range(init)] for _ in range(init)]
-        elif isinstance(init, list):
+            self.cells = array('b', bytes(init * init))
+        elif isinstance(init, _BoardView):
+            # Table(t.internal) は従来どおり盤面のコピー
+            self.n = init.table.n
+            self.cells = array('b', init.table.cells)
+        elif isinstance(init, (array, bytearray, memoryview)):
+            # 既存バッファはコピーせずそのまま使う
+            n = math.isqrt(len(init))
+            if n * n != len(init):
+                raise ValueError(f"Buffer length {len(init)} is not a square")
+            if isinstance(init, array):
+                if init.typecode != 'b':
+                    raise ValueError("array buffer must have typecode 'b'")
+                self.cells = init
+            else:
+                self.cells = memoryview(init).cast('B').cast('b')
+            self.n = n
+        elif isinstance(init, Sequence) and not isinstance(init, (str, bytes)):
+            # 行の列 (list of lists など)
             self.n = len(init)
-            self.internal = copy.deepcopy(init)
+            self.cells = array('b', [val for line in init for val in line])
         else:
-            raise NotImplemented
+            raise TypeError(f"Table() expects a size, a list of rows or an int8 buffer, not {type(init).__name__}")
+        self.placements = None # eval で見つけた各ピースの (rot, dx, dy)
+        self._scan()
+
+    def _scan(self):
+        n = self.n
+        self.occupied_mask = 0
+        self.obstacle_mask = 0
+        self.x_counts = [0] * n
+        self.y_counts = [0] * n
+        self._count = 0
+        for i, val in enumerate(self.cells):
+            if val != 0:
+                self.obstacle_mask |= (1 << i)
+                if val > 0:
+                    r, c = divmod(i, n)
+                    self.occupied_mask |= (1 << i)
+                    self.x_counts[c] += 1
+                    self.y_counts[r] += 1
+                    self._count += 1
+
+    @property
+    def internal(self):
+        return _BoardView(self)
+
+    def tolist(self):
+        n = self.n
+        return [self.cells[r * n:(r + 1) * n].tolist() for r in range(n)]
+
+    def copy(self):
+        return Table(array('b', self.cells))
 
     def show(self):
-        for line in self.internal:
+        for line in self.tolist():
             print(line)
 
     def count(self):
-        count = 0
-        for line in self.internal:
-            count += sum([1 if masu > 0 else 0 for masu in line])
-        return count
+        return self._count
 
     def set(self, x, y, val):
         if not 0 <= x < self.n:
             raise IndexError()
         if not 0 <= y < self.n:
             raise IndexError()
-        self.internal[self.n - y - 1][x] = val
+        r = self.n - y - 1
+        i = r * self.n + x
+        old = self.cells[i]
+        if old == val:
+            return
+        bit = 1 << i
+        if old > 0:
+            self.occupied_mask &= ~bit
+            self.x_counts[x] -= 1
+            self.y_counts[r] -= 1
+            self._count -= 1
+        if val > 0:
+            self.occupied_mask |= bit
+            self.x_counts[x] += 1
+            self.y_counts[r] += 1
+            self._count += 1
+        if val != 0:
+            self.obstacle_mask |= bit
+        else:
+            self.obstacle_mask &= ~bit
+        self.cells[i] = val
 
     def get(self, x, y):
         if not 0 <= x < self.n:
             raise IndexError()
         if not 0 <= y < self.n:
             raise IndexError()
-        return self.internal[self.n - y - 1][x]
+        return self.cells[(self.n - y - 1) * self.n + x]
 
     # --- matplotlibによる可視化メソッド ---
     def visualize(self, xans=None, yans=None, show=True):
         n = self.n
         # (0,0)を左下にするため、internal(上から下)を逆順にしてnumpy配列化
-        data = np.array(self.internal)[::-1]
+        data = np.frombuffer(self.cells, dtype=np.int8).reshape(n, n)[::-1]
 
         fig, ax = plt.subplots(figsize=(8, 8))
 
@@ -115,7 +284,8 @@ class Table:
         else:
             return fig
 
-    def eval(self, xans: list, yans: list, mats: list):
+    def eval(self, xans: list, yans: list, mats: list, cache=None, engine='auto', hint=None,
+             checkpoint=None, checkpoint_interval=60.0, value_order=None, library=None):
         if len(xans) != self.n or len(yans) != self.n:
             raise ValueError()
 
@@ -123,25 +293,32 @@ class Table:
         if sum(xans) != sum(yans) or sum(xans) != sum(mats) + self.count():
             raise ValueError(f"Sum Mismatch. X:{sum(xans)} Y:{sum(yans)} Blocks:{sum(mats) + self.count()}")
 
+        # 対称な盤面も含めて過去に解いた問題ならキャッシュから返す (cache: cache.SolutionCache)
+        if cache is not None:
+            initial_board = self.tolist()
+            hit, cached = cache.lookup(initial_board, xans, yans, mats)
+            if hit:
+                print("[Cache] Hit.")
+                if cached is None:
+                    print("No solution found.")
+                    return None
+                n = self.n
+                for r in range(n):
+                    for c in range(n):
+                        self.set(c, n - r - 1, cached[r][c])
+                self.placements = self._find_placements(mats)
+                return self
+            print("[Cache] Miss.")
+
         print("OK: Starting Optimized Solver...")
 
         # --- Solver Setup ---
         n = self.n
 
-        # 盤面の初期状態スキャン
-        obstacle_mask = 0
-        current_x_counts = [0] * n
-        current_y_counts = [0] * n # index 0 is top row (y=n-1)
-
-        for r in range(n):
-            for c in range(n):
-                val = self.internal[r][c]
-                if val != 0:
-                    # 1 も -1 も配置不可場所としてマスク
-                    obstacle_mask |= (1 << (r * n + c))
-                    if val > 0: # 1だけカウント
-                        current_x_counts[c] += 1
-                        current_y_counts[r] += 1
+        # 盤面の初期状態はTableが逐次管理しているのでコピーするだけ
+        obstacle_mask = self.obstacle_mask
+        current_x_counts = self.x_counts[:]
+        current_y_counts = self.y_counts[:] # index 0 is top row (y=n-1)
 
         # 初期チェック
         for i in range(n):
@@ -149,106 +326,65 @@ class Table:
                 print("Impossible: Initial board exceeds constraints.")
                 return
 
-        # ピース配置の事前計算
-        print(f"[Progress] Calculating piece placement options... (Pieces: {len(mats)})")
-        placement_options = []
-        for mat_idx, mat in enumerate(mats):
-            options = []
-            for rot_idx in range(4):
-                rotated_mat = mat.rotate(rot_idx)
-                for dy in range(n):
-                    for dx in range(n):
-                        mask = 0
-                        possible = True
-                        x_adds = [0] * n
-                        y_adds = [0] * n
-
-                        for px, py in rotated_mat.positions:
-                            tx, ty = px + dx, py + dy
-                            if not (0 <= tx < n and 0 <= ty < n):
-                                possible = False
-                                break
-                            r = n - ty - 1 # y to row index
-                            c = tx
-                            mask |= (1 << (r * n + c))
-                            x_adds[c] += 1
-                            y_adds[r] += 1
-
-                        if possible:
-                            if (mask & obstacle_mask) == 0:
-                                options.append({
-                                    'mask': mask,
-                                    'x_adds': x_adds,
-                                    'y_adds': y_adds,
-                                    'rot': rot_idx,
-                                    'dx': dx,
-                                    'dy': dy
-                                })
-            if not options:
-                print(f"Material {mat_idx} cannot be placed.")
-                return
-            placement_options.append(options)
-            print(f"[Progress] Piece {mat_idx + 1}/{len(mats)}: Generated {len(options)} placement options")
-
-        print(f"[Progress] Placement options calculation complete. Starting DFS search...")
-
-        # DFS
-        solution_history = [None] * len(mats)
-        found = False
-        iteration_count = [0]  # リストで包んでnonlocalとして使用
-        log_interval = 20000  # 2万イテレーションごとにログ出力
-
-        def solve(idx, current_mask, cur_x, cur_y):
-            nonlocal found
-            if found: return
-            
-            # イテレーションカウント
-            iteration_count[0] += 1
-            if iteration_count[0] % log_interval == 0:
-                print(f"[Progress] DFS search: {iteration_count[0]:,} iterations (Current depth: {idx}/{len(mats)})")
-            
-            if idx == len(mats):
-                found = True
-                return
-
-            for opt in placement_options[idx]:
-                if found: return
-                if (current_mask & opt['mask']) != 0:
-                    continue
-
-                # 枝刈り: X合計チェック
-                next_x = cur_x[:]
-                valid_x = True
-                for i in range(n):
-                    next_x[i] += opt['x_adds'][i]
-                    if next_x[i] > xans[i]:
-                        valid_x = False; break
-                if not valid_x: continue
-
-                # 枝刈り: Y合計チェック
-                next_y = cur_y[:]
-                valid_y = True
-                for i in range(n):
-                    next_y[i] += opt['y_adds'][i]
-                    if next_y[i] > yans[i]:
-                        valid_y = False; break
-                if not valid_y: continue
-
-                solution_history[idx] = opt
-                solve(idx + 1, current_mask | opt['mask'], next_x, next_y)
-
-        solve(0, obstacle_mask, current_x_counts, current_y_counts)
-        
-        print(f"[Progress] DFS search complete. Total iterations: {iteration_count[0]:,}")
+        placement_options = self.placement_options(mats, library)
+        if placement_options is None:
+            return
+
+        # 前回の配置 (hint) があれば, まずそれを流用して直せるか試す
+        solution_history = None
+        if hint is not None:
+            solution_history = self._repair(placement_options, hint, obstacle_mask,
+                                            current_x_counts, current_y_counts, xans, yans)
+
+        if solution_history is None:
+            print(f"[Progress] Placement options calculation complete. Starting DFS search...")
+
+            # engine: 'python' / 'jit' (kernel.py) / 'auto' (numbaがあればjit) / 'mitm' (mitm.py, ピース数が多い場合向け)
+            #         / 'portfolio' (portfolio.py, 複数の探索設定を並列に競わせる)
+            # checkpoint (途中保存/再開) と value_order (option の並べ替え) は python エンジンのみ対応
+            if checkpoint is not None or value_order is not None:
+                if engine not in ('auto', 'python'):
+                    raise ValueError(f"checkpoint/value_order are not supported by engine: {engine}")
+                engine = 'python'
+            if engine == 'auto':
+                import kernel
+                engine = 'jit' if kernel.HAVE_NUMBA else 'python'
+            if engine == 'jit':
+                import kernel
+                solution_history, iterations = kernel.search(
+                    n, placement_options, obstacle_mask, current_x_counts, current_y_counts, xans, yans)
+            elif engine == 'mitm':
+                import mitm
+                solution_history, iterations = mitm.search(
+                    n, placement_options, obstacle_mask, current_x_counts, current_y_counts, xans, yans)
+            elif engine == 'portfolio':
+                import portfolio
+                solution_history, iterations = portfolio.search(
+                    n, placement_options, obstacle_mask, current_x_counts, current_y_counts, xans, yans)
+            elif engine == 'python':
+                solution_history, iterations = self._search_python(
+                    placement_options, obstacle_mask, current_x_counts, current_y_counts, xans, yans,
+                    checkpoint=checkpoint, checkpoint_interval=checkpoint_interval, value_order=value_order)
+            else:
+                raise ValueError(f"Unknown engine: {engine}")
+
+            print(f"[Progress] DFS search complete. Total iterations: {iterations:,}")
+        found = solution_history is not None
 
         if found:
-            print("Placed! Visualizing...")
             for i, opt in enumerate(solution_history):
                 rotated_mat = mats[i].rotate(opt['rot'])
                 val = i + 2
                 for px, py in rotated_mat.positions:
                     self.set(px + opt['dx'], py + opt['dy'], val)
+            # 次回の hint 用に各ピースの (rot, dx, dy) を残す
+            self.placements = [(opt['rot'], opt['dx'], opt['dy']) for opt in solution_history]
+
+        if cache is not None:
+            cache.store(initial_board, xans, yans, mats, self.tolist() if found else None)
 
+        if found:
+            print("Placed! Visualizing...")
             # --- ここで可視化を呼び出し ---
             # self.visualize(xans, yans)
             return self
@@ -256,6 +392,514 @@ class Table:
             print("No solution found.")
             return None
 
+    def _find_placements(self, mats):
+        # 盤面に書かれたラベル i+2 のマスから各ピースの (rot, dx, dy) を逆算する (キャッシュから復元した解用)
+        placements = []
+        for i, mat in enumerate(mats):
+            val = i + 2
+            cells = {(x, y) for x in range(self.n) for y in range(self.n) if self.get(x, y) == val}
+            found = None
+            for rot_idx in range(4):
+                positions = mat.rotate(rot_idx).positions
+                dx = min(x for x, y in cells) - min(px for px, py in positions) if cells else 0
+                dy = min(y for x, y in cells) - min(py for px, py in positions) if cells else 0
+                if {(px + dx, py + dy) for px, py in positions} == cells:
+                    found = (rot_idx, dx, dy)
+                    break
+            if found is None:
+                return None
+            placements.append(found)
+        return placements
+
+    def approximate(self, xans: list, yans: list, mats: list, time_limit=10.0, seed=None):
+        # 解が無い/厳密探索が重すぎる場合用. 焼きなまし法 (anneal.py) で time_limit 秒以内に
+        # 行/列の目標との差が最小の盤面を探して書き込む
+        # returns 目標との差の合計 (0 なら厳密解). 置けないピースがあれば None
+        if len(xans) != self.n or len(yans) != self.n:
+            raise ValueError()
+        import anneal
+
+        print(f"OK: Starting approximate solver... (Time limit: {time_limit}s)")
+        placement_options = self.placement_options(mats)
+        if placement_options is None:
+            return None
+
+        choices, violation, overlap, moves = anneal.search(
+            self.n, placement_options, self.obstacle_mask, self.x_counts, self.y_counts, xans, yans,
+            time_limit=time_limit, seed=seed)
+        print(f"[Progress] Local search complete. Moves: {moves:,} Violation: {violation} Overlap: {overlap}")
+
+        # 重なったマスは先に置いたピースを残す
+        for i, opt in enumerate(choices):
+            rotated_mat = mats[i].rotate(opt['rot'])
+            for px, py in rotated_mat.positions:
+                if self.get(px + opt['dx'], py + opt['dy']) == 0:
+                    self.set(px + opt['dx'], py + opt['dy'], i + 2)
+
+        violation = (sum(abs(c - t) for c, t in zip(self.x_counts, xans)) +
+                     sum(abs(c - t) for c, t in zip(self.y_counts, yans)))
+        if violation == 0 and overlap == 0:
+            print("Placed! (exact solution)")
+        else:
+            print(f"Approximate board: total row/column violation {violation}")
+        return violation
+
+    def estimate(self, xans: list, yans: list, mats: list, time_limit=0.3, seed=None, library=None):
+        # eval (python エンジン) の探索ノード数と実行時間の見積もり (estimate.py).
+        # 速い/遅いキューへの振り分けや ETA 表示用. 置けないピースがあれば None
+        if len(xans) != self.n or len(yans) != self.n:
+            raise ValueError()
+        import estimate
+
+        placement_options = self.placement_options(mats, library)
+        if placement_options is None:
+            return None
+        result = estimate.estimate(self.n, placement_options, self.obstacle_mask, self.x_counts, self.y_counts,
+                                   xans, yans, time_limit=time_limit, seed=seed)
+        print(f"[Estimate] ~{result['nodes']:,.0f} nodes (+/- {result['error']:,.0f}), "
+              f"~{result['seconds']:.2f}s ({result['probes']:,} probes)")
+        return result
+
+    def count_solutions(self, xans: list, yans: list, mats: list, max_states=None, library=None):
+        # 解 (異なる盤面) の個数を, 解を作らずに数える (transfer.py). 盤面は書き換えない
+        if len(xans) != self.n or len(yans) != self.n:
+            raise ValueError()
+        if sum(xans) != sum(yans) or sum(xans) != sum(mats) + self.count():
+            return 0
+        import transfer
+
+        placement_options = self.placement_options(mats, library)
+        if placement_options is None:
+            return 0
+        return transfer.count(self.n, placement_options, self.obstacle_mask, self.x_counts, self.y_counts,
+                              xans, yans, max_states=max_states)
+
+    def enumerate_solutions(self, xans: list, yans: list, mats: list, path, limit=None, library=None):
+        # 全解 (異なる盤面) を python エンジンで列挙し, 1解 = ピースごとの option 番号として path に書き出す
+        # (solutions.py. 読み出しは solutions.SolutionFile). 盤面は書き換えない
+        # limit: 書き出す解の数の上限. returns 書き出した解の数
+        if len(xans) != self.n or len(yans) != self.n:
+            raise ValueError()
+        if sum(xans) != sum(yans) or sum(xans) != sum(mats) + self.count():
+            raise ValueError(f"Sum Mismatch. X:{sum(xans)} Y:{sum(yans)} Blocks:{sum(mats) + self.count()}")
+        import solutions
+
+        placement_options = self.placement_options(mats, library)
+        if placement_options is None:
+            placement_options = [[] for _ in mats]
+        # 回転対称なピースで同じマスクになる option は1つだけ探索する (同じ盤面を重複して出さない)
+        unique = []
+        origin = []
+        for options in placement_options:
+            seen = {}
+            for k, opt in enumerate(options):
+                seen.setdefault(opt['mask'], k)
+            origin.append(list(seen.values()))
+            unique.append([options[k] for k in origin[-1]])
+
+        with solutions.SolutionWriter(path, self.tolist(), xans, yans, mats, placement_options) as writer:
+            def on_solution(choices):
+                writer.add([origin[d][k] for d, k in enumerate(choices)])
+                if writer.total % 100000 == 0:
+                    print(f"[Progress] Enumerated {writer.total:,} solutions")
+                return limit is not None and writer.total >= limit
+
+            if all(unique):
+                _, iterations = self._search_python(unique, self.obstacle_mask, self.x_counts, self.y_counts,
+                                                    xans, yans, on_solution=on_solution)
+                print(f"[Progress] Enumeration complete. Total iterations: {iterations:,}")
+            total = writer.total
+        print(f"Wrote {total:,} solutions to {path}")
+        return total
+
+    def placement_options(self, mats, library=None):
+        # ピース配置の事前計算 (障害物と重なる配置は除外). 置けないピースがあれば None
+        # library (library.PlacementLibrary) に載っている形状はファイルから切り出すだけで済ませる
+        n = self.n
+        obstacle_mask = self.obstacle_mask
+        print(f"[Progress] Calculating piece placement options... (Pieces: {len(mats)})")
+        placement_options = []
+        for mat_idx, mat in enumerate(mats):
+            options = None
+            if library is not None:
+                options = library.placement_options(n, mat, obstacle_mask)
+            if options is None:
+                options = self._generate_options(mat)
+            if not options:
+                print(f"Material {mat_idx} cannot be placed.")
+                return None
+            placement_options.append(options)
+            print(f"[Progress] Piece {mat_idx + 1}/{len(mats)}: Generated {len(options)} placement options")
+        return placement_options
+
+    def _generate_options(self, mat):
+        n = self.n
+        obstacle_mask = self.obstacle_mask
+        options = []
+        for rot_idx in range(4):
+            rotated_mat = mat.rotate(rot_idx)
+            for dy in range(n):
+                for dx in range(n):
+                    mask = 0
+                    possible = True
+                    x_adds = [0] * n
+                    y_adds = [0] * n
+
+                    for px, py in rotated_mat.positions:
+                        tx, ty = px + dx, py + dy
+                        if not (0 <= tx < n and 0 <= ty < n):
+                            possible = False
+                            break
+                        r = n - ty - 1 # y to row index
+                        c = tx
+                        mask |= (1 << (r * n + c))
+                        x_adds[c] += 1
+                        y_adds[r] += 1
+
+                    if possible:
+                        if (mask & obstacle_mask) == 0:
+                            options.append({
+                                'mask': mask,
+                                'x_adds': x_adds,
+                                'y_adds': y_adds,
+                                'rot': rot_idx,
+                                'dx': dx,
+                                'dy': dy
+                            })
+        return options
+
+    def _repair(self, placement_options, hint, obstacle_mask, current_x_counts, current_y_counts, xans, yans):
+        # hint: 前回の各ピースの (rot, dx, dy). 今の制約を満たさないピースとその周辺だけを
+        # 置き直す小さなDFSを試し, だめなら None を返して全探索に任せる
+        n = self.n
+        num_pieces = len(placement_options)
+        if len(hint) != num_pieces:
+            print("[Warm start] Hint does not match the pieces. Skipping.")
+            return None
+
+        kept = []
+        mask = obstacle_mask
+        for options, placement in zip(placement_options, hint):
+            opt = None
+            for candidate in options:
+                if (candidate['rot'], candidate['dx'], candidate['dy']) == tuple(placement):
+                    opt = candidate
+                    break
+            # 盤面の編集で置けなくなった/他と重なるピースは置き直し対象
+            if opt is not None and mask & opt['mask']:
+                opt = None
+            if opt is not None:
+                mask |= opt['mask']
+            kept.append(opt)
+
+        def touches(opt, x_lines, y_lines):
+            return (any(opt['x_adds'][c] for c in x_lines) or
+                    any(opt['y_adds'][r] for r in y_lines))
+
+        repair = {idx for idx in range(num_pieces) if kept[idx] is None}
+        x_counts = current_x_counts[:]
+        y_counts = current_y_counts[:]
+        for opt in kept:
+            if opt is not None:
+                for i in range(n):
+                    x_counts[i] += opt['x_adds'][i]
+                    y_counts[i] += opt['y_adds'][i]
+        bad_x = {c for c in range(n) if x_counts[c] != xans[c]}
+        bad_y = {r for r in range(n) if y_counts[r] != yans[r]}
+        repair |= {idx for idx, opt in enumerate(kept) if opt is not None and touches(opt, bad_x, bad_y)}
+
+        if not repair:
+            print("[Warm start] Previous placement still satisfies the puzzle.")
+            return kept
+
+        for attempt in range(2):
+            if len(repair) == num_pieces:
+                break
+            fixed = [idx for idx in range(num_pieces) if idx not in repair]
+            sub = sorted(repair)
+            print(f"[Warm start] Repairing {len(sub)}/{num_pieces} pieces...")
+            mask = obstacle_mask
+            sub_x = current_x_counts[:]
+            sub_y = current_y_counts[:]
+            for idx in fixed:
+                mask |= kept[idx]['mask']
+                for i in range(n):
+                    sub_x[i] += kept[idx]['x_adds'][i]
+                    sub_y[i] += kept[idx]['y_adds'][i]
+            history, iterations = self._search_python(
+                [placement_options[idx] for idx in sub], mask, sub_x, sub_y, xans, yans)
+            if history is not None:
+                print(f"[Warm start] Repaired. Iterations: {iterations:,}")
+                solution = kept[:]
+                for idx, opt in zip(sub, history):
+                    solution[idx] = opt
+                return solution
+
+            # 置き直すピースが触れていた行/列に掛かるピースまで広げる
+            for idx in sub:
+                if kept[idx] is not None:
+                    bad_x |= {c for c in range(n) if kept[idx]['x_adds'][c]}
+                    bad_y |= {r for r in range(n) if kept[idx]['y_adds'][r]}
+            widened = {idx for idx in fixed if touches(kept[idx], bad_x, bad_y)}
+            if not widened:
+                break
+            repair |= widened
+
+        print("[Warm start] Repair failed. Falling back to full search.")
+        return None
+
+    def _search_python(self, placement_options, obstacle_mask, current_x_counts, current_y_counts, xans, yans,
+                       checkpoint=None, checkpoint_interval=60.0, capacity=False, value_order=None,
+                       on_solution=None):
+        # DFS (明示スタックの反復版). returns (各ピースの採用option or None, イテレーション数)
+        # checkpoint: ファイルパスを渡すと checkpoint_interval 秒ごとに探索状態を書き出し,
+        # ファイルが既にあればそこから再開する (完了したら削除)
+        # capacity: 各行/列の残り必要数が, その行/列の空きマス数か残りピースで埋められる最大数を超えたら枝刈りする
+        # value_order: 各ノードでの option の試す順番
+        #   None: 生成順 / 'deficit': 残り必要数の大きい行/列を埋める option から
+        #   'isolation': 置いた後に孤立する空きマス (上下左右が埋まっている) が少ない option から
+        # on_solution: 渡すと最初の解で止まらずに全解を列挙し, 解ごとに各ピースの option 番号のリストで呼ぶ
+        #   (True を返したらそこで打ち切る). この場合の戻り値の解は None
+        import estimate
+
+        n = self.n
+        num_pieces = len(placement_options)
+        if capacity:
+            col_masks = [sum(1 << (r * n + c) for r in range(n)) for c in range(n)]
+            row_masks = [((1 << n) - 1) << (r * n) for r in range(n)]
+            # reach[d]: ピース d 以降が1本の行/列に置けるマス数の合計の上限
+            reach = [0] * (num_pieces + 1)
+            for d in range(num_pieces - 1, -1, -1):
+                reach[d] = reach[d + 1] + max(max(opt['x_adds'] + opt['y_adds']) for opt in placement_options[d])
+        if value_order is not None:
+            if value_order not in ('deficit', 'isolation'):
+                raise ValueError(f"Unknown value order: {value_order}")
+            # option ごとの (列, 数) / (行, 数) の疎な表
+            sparse = [[(tuple((c, a) for c, a in enumerate(opt['x_adds']) if a),
+                        tuple((r, a) for r, a in enumerate(opt['y_adds']) if a))
+                       for opt in options] for options in placement_options]
+            full = (1 << (n * n)) - 1
+            first_col = sum(1 << (r * n) for r in range(n))
+            last_col = first_col << (n - 1)
+        log_interval = 20000  # 2万イテレーションごとにログ出力
+
+        def order_options(d):
+            # depth d のノードで試す option 番号の列
+            # 並べ替える場合は, 重なる/行列の目標を超える option を先に落としてから点数順にする
+            options = placement_options[d]
+            if value_order is None:
+                return range(len(options))
+            mask = masks[d]
+            x_room = [xans[i] - x_stack[d][i] for i in range(n)]
+            y_room = [yans[i] - y_stack[d][i] for i in range(n)]
+            scored = []
+            for k, (xs, ys) in enumerate(sparse[d]):
+                opt_mask = options[k]['mask']
+                if mask & opt_mask:
+                    continue
+                if any(x_room[c] < a for c, a in xs) or any(y_room[r] < a for r, a in ys):
+                    continue
+                if value_order == 'deficit':
+                    score = -(sum(x_room[c] * a for c, a in xs) + sum(y_room[r] * a for r, a in ys))
+                else:
+                    free = full & ~(mask | opt_mask)
+                    neighbors = (((free >> 1) & ~last_col) | ((free << 1) & ~first_col) |
+                                 (free >> n) | (free << n))
+                    score = (free & ~neighbors).bit_count()
+                scored.append((score, k))
+            scored.sort()
+            return [k for score, k in scored]
+
+        # depth ごとの状態: cursor は orders[depth] の中で次に試す位置 (depth より浅い段では採用中 + 1)
+        cursor = [0] * (num_pieces + 1)
+        masks = [obstacle_mask] + [0] * num_pieces
+        x_stack = [current_x_counts[:]] + [None] * num_pieces
+        y_stack = [current_y_counts[:]] + [None] * num_pieces
+        depth = 0
+        iterations = 1
+
+        if num_pieces == 0:
+            # ピースがなければ空の配置がそのまま解 (kernel.search と同じく ([], 1))
+            if checkpoint is not None and os.path.exists(checkpoint):
+                os.remove(checkpoint)
+            if on_solution is not None:
+                on_solution([])
+                return None, iterations
+            return [], iterations
+
+        if checkpoint is not None:
+            fingerprint = _search_fingerprint(placement_options, obstacle_mask, current_x_counts,
+                                              current_y_counts, xans, yans)
+            state = _load_checkpoint(checkpoint, fingerprint)
+            if state is not None:
+                depth = state['depth']
+                iterations = state['iterations']
+                for d in range(depth + 1):
+                    cursor[d] = state['cursor'][d]
+                    masks[d] = int(state['masks'][d], 16)
+                    x_stack[d] = state['x_counts'][d]
+                    y_stack[d] = state['y_counts'][d]
+                if state.get('value_order') != value_order:
+                    raise ValueError(f"Checkpoint {checkpoint} was written with value_order={state.get('value_order')}")
+                print(f"[Progress] Resumed from checkpoint: {iterations:,} iterations (Current depth: {depth}/{num_pieces})")
+
+            def save():
+                _save_checkpoint(checkpoint, {
+                    'fingerprint': fingerprint,
+                    'depth': depth,
+                    'iterations': iterations,
+                    'cursor': cursor[:depth + 1],
+                    'masks': [format(m, 'x') for m in masks[:depth + 1]],
+                    'x_counts': x_stack[:depth + 1],
+                    'y_counts': y_stack[:depth + 1],
+                    'value_order': value_order,
+                })
+
+            # Ctrl+C はループ先頭 (状態が揃っている所) で拾って保存してから止める
+            interrupted = []
+            previous_handler = None
+            if threading.current_thread() is threading.main_thread():
+                previous_handler = signal.signal(signal.SIGINT, lambda signum, frame: interrupted.append(signum))
+            last_save = time.perf_counter()
+            steps = 0
+
+        # 並べ替えはノードの状態だけで決まるので, 再開時も同じ順番が再現される
+        orders = [order_options(d) if d < num_pieces else None for d in range(depth + 1)] + [None] * (num_pieces - depth)
+        # seqs[d]: orders[d] の順に並べた option (並べ替えなしなら placement_options[d] そのもの)
+        seqs = [None] * (num_pieces + 1)
+        for d in range(min(depth + 1, num_pieces)):
+            seqs[d] = placement_options[d] if value_order is None else [placement_options[d][k] for k in orders[d]]
+        # ログには浅い段の枝番号から見た進み具合と残り時間の目安も出す (estimate.progress)
+        started = time.perf_counter()
+        start_fraction = estimate.progress(cursor, orders, depth)
+
+        solution_history = None
+        try:
+            # 1周 = 1ノード分. option の走査は内側の for で回し, cursor/スタックは降りる/戻る時だけ触る
+            while True:
+                if checkpoint is not None:
+                    if interrupted:
+                        save()
+                        print(f"[Progress] Interrupted. Checkpoint saved to {checkpoint}")
+                        raise KeyboardInterrupt()
+                    # 時刻の確認は 1024 ステップごと (checkpoint_interval=0 ならその度に保存)
+                    steps += 1
+                    if steps & 1023 == 0 and time.perf_counter() - last_save >= checkpoint_interval:
+                        save()
+                        last_save = time.perf_counter()
+
+                seq = seqs[depth]
+                cur_mask = masks[depth]
+                cur_x = x_stack[depth]
+                cur_y = y_stack[depth]
+                descended = False
+                for k in range(cursor[depth], len(seq)):
+                    opt = seq[k]
+                    if (cur_mask & opt['mask']) != 0:
+                        continue
+
+                    # 枝刈り: X合計チェック
+                    next_x = cur_x[:]
+                    valid_x = True
+                    for i in range(n):
+                        next_x[i] += opt['x_adds'][i]
+                        if next_x[i] > xans[i]:
+                            valid_x = False; break
+                    if not valid_x: continue
+
+                    # 枝刈り: Y合計チェック
+                    next_y = cur_y[:]
+                    valid_y = True
+                    for i in range(n):
+                        next_y[i] += opt['y_adds'][i]
+                        if next_y[i] > yans[i]:
+                            valid_y = False; break
+                    if not valid_y: continue
+
+                    next_mask = cur_mask | opt['mask']
+                    # 枝刈り: 行/列の空きマス数チェック
+                    if capacity:
+                        free = ~next_mask
+                        limit = reach[depth + 1]
+                        if (any(xans[i] - next_x[i] > min(limit, (free & col_masks[i]).bit_count()) for i in range(n)) or
+                                any(yans[i] - next_y[i] > min(limit, (free & row_masks[i]).bit_count()) for i in range(n))):
+                            continue
+
+                    cursor[depth] = k + 1
+                    masks[depth + 1] = next_mask
+                    x_stack[depth + 1] = next_x
+                    y_stack[depth + 1] = next_y
+                    cursor[depth + 1] = 0
+                    descended = True
+                    break
+
+                if not descended:
+                    # このノードの option を使い切ったので1段戻る
+                    if depth == 0:
+                        break
+                    depth -= 1
+                    continue
+
+                depth += 1
+                # イテレーションカウント
+                iterations += 1
+                if iterations % log_interval == 0:
+                    fraction = estimate.progress(cursor, orders, depth)
+                    eta = ""
+                    if fraction > start_fraction:
+                        remaining = (time.perf_counter() - started) * (1 - fraction) / (fraction - start_fraction)
+                        eta = f", ETA {remaining:.0f}s"
+                    print(f"[Progress] DFS search: {iterations:,} iterations (Current depth: {depth}/{num_pieces}, "
+                          f"~{fraction:.1%} done{eta})")
+
+                if depth < num_pieces:
+                    orders[depth] = order_options(depth)
+                    seqs[depth] = (placement_options[depth] if value_order is None
+                                   else [placement_options[depth][k] for k in orders[depth]])
+                elif on_solution is None:
+                    break
+                else:
+                    depth -= 1
+                    if on_solution([orders[d][cursor[d] - 1] for d in range(num_pieces)]):
+                        break
+
+            if depth == num_pieces:
+                solution_history = [placement_options[d][orders[d][cursor[d] - 1]] for d in range(num_pieces)]
+        finally:
+            if checkpoint is not None and previous_handler is not None:
+                signal.signal(signal.SIGINT, previous_handler)
+
+        # 探索が最後まで終わったらチェックポイントは不要
+        if checkpoint is not None and os.path.exists(checkpoint):
+            os.remove(checkpoint)
+        return solution_history, iterations
+
+
+def _search_fingerprint(placement_options, obstacle_mask, x_counts, y_counts, xans, yans):
+    # 別の問題のチェックポイントから再開しないための指紋
+    h = hashlib.sha256(repr((obstacle_mask, list(x_counts), list(y_counts), list(xans), list(yans))).encode())
+    for options in placement_options:
+        h.update(repr([opt['mask'] for opt in options]).encode())
+    return h.hexdigest()
+
+
+def _load_checkpoint(path, fingerprint):
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        state = json.load(f)
+    if state.get('fingerprint') != fingerprint:
+        raise ValueError(f"Checkpoint {path} belongs to a different puzzle")
+    return state
+
+
+def _save_checkpoint(path, state):
+    # 途中で落ちても壊れないように一時ファイルに書いてから置き換える
+    tmp = path + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(state, f, separators=(',', ':'))
+    os.replace(tmp, path)
+
 
 
 class Material:
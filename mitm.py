@@ -0,0 +1,131 @@
+import os
+import pickle
+import tempfile
+
+# メモリ上に保持する部分配置の上限 (超えたらパーティションごとにディスクへ退避する)
+MAX_ENTRIES = 2_000_000
+PARTITIONS = 64
+
+
+def enumerate_half(n, placement_options, pieces, obstacle_mask, start_counts, targets):
+    # pieces の重ならない部分配置を列挙する
+    # yields (counts, mask, choices): counts は start_counts からの x+y 合計, mask はピースのマスのみ
+    width = 2 * n
+    choices = [0] * len(pieces)
+
+    def walk(depth, mask, counts):
+        if depth == len(pieces):
+            yield counts, mask ^ obstacle_mask, tuple(choices)
+            return
+        for opt_idx, opt in enumerate(placement_options[pieces[depth]]):
+            if mask & opt['mask']:
+                continue
+            adds = opt['x_adds'] + opt['y_adds']
+            next_counts = [counts[i] + adds[i] for i in range(width)]
+            if any(next_counts[i] > targets[i] for i in range(width)):
+                continue
+            choices[depth] = opt_idx
+            yield from walk(depth + 1, mask | opt['mask'], next_counts)
+
+    yield from walk(0, obstacle_mask, list(start_counts))
+
+
+class _Spool:
+    # 署名のハッシュでパーティション分けしつつ, 上限を超えたら一時ファイルに書き出す
+    def __init__(self, spill_dir, name, max_entries):
+        self.spill_dir = spill_dir
+        self.name = name
+        self.max_entries = max_entries
+        self.memory = [[] for _ in range(PARTITIONS)]
+        self.size = 0
+        self.spilled = False
+        self.paths = [os.path.join(spill_dir, f"{name}-{p}.bin") for p in range(PARTITIONS)]
+
+    def add(self, key, mask, choices):
+        self.memory[hash(key) % PARTITIONS].append((key, mask, choices))
+        self.size += 1
+        if self.size >= self.max_entries:
+            self.flush()
+
+    def flush(self):
+        for p, entries in enumerate(self.memory):
+            if entries:
+                with open(self.paths[p], 'ab') as f:
+                    for entry in entries:
+                        pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+                entries.clear()
+        self.size = 0
+        self.spilled = True
+
+    def partition(self, p):
+        if os.path.exists(self.paths[p]):
+            with open(self.paths[p], 'rb') as f:
+                while True:
+                    try:
+                        yield pickle.load(f)
+                    except EOFError:
+                        break
+        yield from self.memory[p]
+
+
+def search(n, placement_options, obstacle_mask, x_counts, y_counts, xans, yans,
+           max_entries=None, spill_dir=None):
+    # ピースを前半/後半に分け, 後半を署名 (x+y 合計ベクトル) でハッシュ索引化し,
+    # 前半の補数署名で結合する. returns (solution_history or None, 列挙した部分配置数)
+    if max_entries is None:
+        max_entries = MAX_ENTRIES
+    num_pieces = len(placement_options)
+    left = list(range(num_pieces // 2))
+    right = list(range(num_pieces // 2, num_pieces))
+    targets = list(xans) + list(yans)
+    init_counts = list(x_counts) + list(y_counts)
+    # 後半は初期盤面の分を差し引いた残り容量で枝刈りする
+    right_targets = [t - c for t, c in zip(targets, init_counts)]
+
+    def answer(left_choices, right_choices):
+        choices = list(left_choices) + list(right_choices)
+        return [placement_options[i][choices[i]] for i in range(num_pieces)]
+
+    with tempfile.TemporaryDirectory(dir=spill_dir, prefix='mitm-') as tmp:
+        print(f"[Progress] MITM: enumerating right half ({len(right)} pieces)...")
+        right_spool = _Spool(tmp, 'right', max_entries)
+        generated = 0
+        for counts, mask, choices in enumerate_half(n, placement_options, right, obstacle_mask,
+                                                    [0] * (2 * n), right_targets):
+            right_spool.add(bytes(counts), mask, choices)
+            generated += 1
+        print(f"[Progress] MITM: {generated:,} right partial placements "
+              f"({'spilled to disk' if right_spool.spilled else 'in memory'})")
+
+        left_half = enumerate_half(n, placement_options, left, obstacle_mask, init_counts, targets)
+
+        if not right_spool.spilled:
+            # 後半が全部メモリに載っていれば前半は保存せずにその場で突き合わせる
+            index = {}
+            for entries in right_spool.memory:
+                for key, mask, choices in entries:
+                    index.setdefault(key, []).append((mask, choices))
+            for counts, mask, choices in left_half:
+                generated += 1
+                for right_mask, right_choices in index.get(bytes(t - c for t, c in zip(targets, counts)), ()):
+                    if not (mask & right_mask):
+                        return answer(choices, right_choices), generated
+            return None, generated
+
+        # グレースハッシュ結合: 前半も同じパーティションに分けて退避し, パーティションごとに結合
+        left_spool = _Spool(tmp, 'left', max_entries)
+        for counts, mask, choices in left_half:
+            left_spool.add(bytes(t - c for t, c in zip(targets, counts)), mask, choices)
+            generated += 1
+        left_spool.flush()
+        right_spool.flush()
+        print(f"[Progress] MITM: {generated:,} partial placements total, joining {PARTITIONS} partitions...")
+        for p in range(PARTITIONS):
+            index = {}
+            for key, mask, choices in right_spool.partition(p):
+                index.setdefault(key, []).append((mask, choices))
+            for key, mask, choices in left_spool.partition(p):
+                for right_mask, right_choices in index.get(key, ()):
+                    if not (mask & right_mask):
+                        return answer(choices, right_choices), generated
+        return None, generated
@@ -0,0 +1,126 @@
+import io
+import json
+import multiprocessing
+import os
+import queue
+import random
+import time
+from contextlib import redirect_stdout
+
+from main import Table, _search_fingerprint
+
+# 並列に走らせる探索設定
+# order: ピースの順番 ('given' / 'largest': 大きい順 / 'fewest': option が少ない順 / 'random')
+# shuffle: option の順番を seed で並べ替える, capacity: 行/列の空きマス数による枝刈り
+# value_order: ノードごとの option の並べ替え (Table._search_python 参照)
+STRATEGIES = [
+    {'name': 'given'},
+    {'name': 'fewest+deficit', 'order': 'fewest', 'value_order': 'deficit'},
+    {'name': 'fewest+capacity', 'order': 'fewest', 'capacity': True},
+    {'name': 'deficit', 'value_order': 'deficit'},
+    {'name': 'largest', 'order': 'largest'},
+    {'name': 'largest+isolation', 'order': 'largest', 'value_order': 'isolation'},
+    {'name': 'random-1', 'order': 'random', 'shuffle': True, 'seed': 1},
+    {'name': 'random-2', 'order': 'random', 'shuffle': True, 'seed': 2, 'capacity': True},
+]
+
+LOG_PATH = 'portfolio.jsonl'
+
+
+def piece_order(placement_options, strategy):
+    order = list(range(len(placement_options)))
+    kind = strategy.get('order', 'given')
+    if kind == 'largest':
+        order.sort(key=lambda i: -sum(placement_options[i][0]['x_adds']))
+    elif kind == 'fewest':
+        order.sort(key=lambda i: len(placement_options[i]))
+    elif kind == 'random':
+        random.Random(strategy.get('seed')).shuffle(order)
+    elif kind != 'given':
+        raise ValueError(f"Unknown piece order: {kind}")
+    return order
+
+
+def _run(strategy, n, placement_options, obstacle_mask, x_counts, y_counts, xans, yans, results):
+    # 結果は (設定名, 解 or None, イテレーション数, 秒数, エラー or None) を results に入れる
+    start = time.perf_counter()
+    try:
+        order = piece_order(placement_options, strategy)
+        options = [placement_options[i][:] for i in order]
+        if strategy.get('shuffle'):
+            rng = random.Random(strategy.get('seed'))
+            for opts in options:
+                rng.shuffle(opts)
+        with redirect_stdout(io.StringIO()):
+            history, iterations = Table(n)._search_python(options, obstacle_mask, x_counts, y_counts, xans, yans,
+                                                          capacity=strategy.get('capacity', False),
+                                                          value_order=strategy.get('value_order'))
+    except Exception as e:
+        results.put((strategy['name'], None, 0, time.perf_counter() - start, f"{type(e).__name__}: {e}"))
+        return
+    # 元のピース順に戻してから返す
+    solution = None
+    if history is not None:
+        solution = [None] * len(order)
+        for opt, i in zip(history, order):
+            solution[i] = opt
+    results.put((strategy['name'], solution, iterations, time.perf_counter() - start, None))
+
+
+def search(n, placement_options, obstacle_mask, x_counts, y_counts, xans, yans,
+           strategies=None, workers=None, log_path=None):
+    # 設定の違う探索を別プロセスで同時に走らせ, 最初に終わった結果 (解あり/解なし) を採用して残りを止める
+    # returns (solution_history or None, 勝った設定のイテレーション数)
+    if strategies is None:
+        strategies = STRATEGIES[:max(1, workers or os.cpu_count() or 1)]
+    if log_path is None:
+        log_path = LOG_PATH
+    results = multiprocessing.Queue()
+    processes = [multiprocessing.Process(
+        target=_run, args=(strategy, n, placement_options, obstacle_mask, x_counts, y_counts, xans, yans, results),
+        daemon=True) for strategy in strategies]
+    print(f"[Progress] Portfolio: racing {len(processes)} strategies...")
+    for process in processes:
+        process.start()
+    try:
+        # 最初に正常に終わった結果を待つ. 全プロセスが答えを出さずに終わったら (例外/強制終了) エラーにする
+        errors = {}
+        while True:
+            try:
+                name, solution, iterations, elapsed, error = results.get(timeout=0.1)
+            except queue.Empty:
+                if all(process.exitcode is not None for process in processes):
+                    # 終了直前に入れた結果がまだ届いていないことがあるので最後にもう一度だけ待つ
+                    try:
+                        name, solution, iterations, elapsed, error = results.get(timeout=1.0)
+                    except queue.Empty:
+                        raise RuntimeError(f"All portfolio strategies exited without a result: {errors}")
+                else:
+                    continue
+            if error is None:
+                break
+            errors[name] = error
+            print(f"[Progress] Portfolio: '{name}' failed ({error})")
+            if len(errors) == len(processes):
+                raise RuntimeError(f"All portfolio strategies failed: {errors}")
+    finally:
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+        for process in processes:
+            process.join()
+
+    print(f"[Progress] Portfolio: '{name}' finished first ({elapsed:.2f}s)")
+    # どの設定が勝ったかを記録しておき, 問題ごとの既定値を学習する材料にする
+    with open(log_path, 'a') as f:
+        f.write(json.dumps({
+            'puzzle': _search_fingerprint(placement_options, obstacle_mask, x_counts, y_counts, xans, yans),
+            'n': n,
+            'pieces': len(placement_options),
+            'strategy': name,
+            'found': solution is not None,
+            'iterations': iterations,
+            'seconds': round(elapsed, 4),
+            'time': time.time(),
+        }) + '\n')
+    return solution, iterations
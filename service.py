@@ -0,0 +1,236 @@
+import argparse
+import asyncio
+import hashlib
+import io
+import itertools
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
+
+# ローカル常駐の求解サービス
+# 1行1リクエストの JSON を localhost TCP か Unix ソケットで受け取り, 優先度付きキューから
+# ウォームなプロセスプールに投げる. 同じ問題が処理中なら結果を共有する
+#
+# request:  {"id": ..., "board": [[...]], "xans": [...], "yans": [...],
+#            "mats": [[[x, y], ...], ...], "priority": 0, "engine": "auto"}
+#            (priority は小さいほど先. board の代わりに "n" だけでもよい)
+# response: {"id": ..., "status": "solved" | "no_solution" | "error",
+#            "board": [[...]], "placements": [...], "error": "..."}
+
+_worker = {}
+
+
+def _init_worker(cache_path, library_path=None):
+    # ワーカー起動時に一度だけソルバーを読み込み, JIT もここでコンパイルしておく
+    from main import Table, Material
+
+    memo = {}
+
+    class WarmTable(Table):
+        # 盤面サイズ/障害物/ピース形状が同じなら配置表を使い回す
+        def placement_options(self, mats, library=None):
+            key = (self.n, self.obstacle_mask, tuple(tuple(mat.positions) for mat in mats))
+            if key not in memo:
+                if len(memo) >= 256:
+                    memo.pop(next(iter(memo)))
+                memo[key] = super().placement_options(mats, library)
+            return memo[key]
+
+    _worker['Table'] = WarmTable
+    _worker['Material'] = Material
+    _worker['cache'] = None
+    if cache_path:
+        from cache import SolutionCache
+        _worker['cache'] = SolutionCache(cache_path)
+    _worker['library'] = None
+    if library_path:
+        from library import PlacementLibrary
+        _worker['library'] = PlacementLibrary(library_path)
+
+    import kernel
+    if kernel.HAVE_NUMBA:
+        with redirect_stdout(io.StringIO()):
+            WarmTable(3).eval([2, 0, 0], [0, 0, 2], [Material([(0, 0), (0, 1)])], engine='jit')
+
+
+def _ping():
+    # 起動確認用 (各ワーカーに1つずつ行き渡るよう少しだけ占有する)
+    time.sleep(0.05)
+    return os.getpid()
+
+
+def _solve(request):
+    Table = _worker['Table']
+    Material = _worker['Material']
+    if 'board' in request:
+        table = Table(request['board'])
+    else:
+        table = Table(request['n'])
+    mats = [Material([tuple(p) for p in positions]) for positions in request['mats']]
+    log = io.StringIO()
+    try:
+        with redirect_stdout(log):
+            result = table.eval(request['xans'], request['yans'], mats, cache=_worker['cache'],
+                                engine=request.get('engine', 'auto'), library=_worker['library'])
+    except Exception as e:
+        return {'status': 'error', 'error': str(e) or type(e).__name__}
+    if result is None:
+        return {'status': 'no_solution'}
+    return {'status': 'solved', 'board': table.tolist(), 'placements': table.placements}
+
+
+def request_key(request):
+    # 優先度や id を除いた問題そのもののハッシュ
+    body = {k: request.get(k) for k in ('n', 'board', 'xans', 'yans', 'mats', 'engine')}
+    return hashlib.sha256(json.dumps(body, sort_keys=True).encode()).hexdigest()
+
+
+class SolveService:
+    def __init__(self, workers=None, cache_path=None, library_path=None):
+        self.workers = workers or os.cpu_count() or 1
+        self.pool = ProcessPoolExecutor(self.workers, initializer=_init_worker,
+                                        initargs=(cache_path, library_path))
+        self.queue = asyncio.PriorityQueue()
+        self.in_flight = {}  # request_key -> Future
+        self.order = itertools.count()
+        self.stats = {'requests': 0, 'deduplicated': 0, 'solved': 0}
+
+    def submit(self, request):
+        # 同じ問題が処理中/待機中ならその Future を返す
+        self.stats['requests'] += 1
+        priority = request.get('priority', 0)
+        if isinstance(priority, bool) or not isinstance(priority, (int, float)):
+            raise ValueError(f"priority must be a number: {priority!r}")
+        key = request_key(request)
+        future = self.in_flight.get(key)
+        if future is not None:
+            self.stats['deduplicated'] += 1
+            return future
+        future = asyncio.get_running_loop().create_future()
+        self.in_flight[key] = future
+        try:
+            self.queue.put_nowait((priority, next(self.order), key, request))
+        except Exception:
+            del self.in_flight[key]
+            raise
+        return future
+
+    async def warm_up(self):
+        # ProcessPoolExecutor はワーカーを最初の submit 時に起動するので,
+        # 受け付けを始める前に全ワーカーで _init_worker (import, JIT の読み込み) を済ませておく
+        loop = asyncio.get_running_loop()
+        pids = set()
+        for _ in range(3):
+            pids |= set(await asyncio.gather(*(loop.run_in_executor(self.pool, _ping)
+                                               for _ in range(self.workers))))
+            if len(pids) >= self.workers:
+                break
+
+    async def _dispatch(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            _, _, key, request = await self.queue.get()
+            future = self.in_flight[key]
+            try:
+                result = await loop.run_in_executor(self.pool, _solve, request)
+            except Exception as e:
+                result = {'status': 'error', 'error': str(e)}
+            del self.in_flight[key]
+            self.stats['solved'] += 1
+            future.set_result(result)
+
+    async def _handle(self, reader, writer):
+        lock = asyncio.Lock()
+
+        async def reply(request):
+            try:
+                result = await self.submit(request)
+            except Exception as e:
+                result = {'status': 'error', 'error': str(e)}
+            async with lock:
+                writer.write((json.dumps({'id': request.get('id'), **result}) + '\n').encode())
+                await writer.drain()
+
+        tasks = set()
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            try:
+                request = json.loads(line)
+                if not isinstance(request, dict):
+                    raise ValueError(f"Request must be a JSON object, not {type(request).__name__}")
+            except ValueError as e:
+                async with lock:
+                    writer.write((json.dumps({'id': None, 'status': 'error', 'error': str(e)}) + '\n').encode())
+                    await writer.drain()
+                continue
+            if request.get('command') == 'stats':
+                async with lock:
+                    writer.write((json.dumps({'id': request.get('id'), **self.stats,
+                                              'queued': self.queue.qsize()}) + '\n').encode())
+                    await writer.drain()
+                continue
+            task = asyncio.create_task(reply(request))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        if tasks:
+            await asyncio.gather(*tasks)
+        writer.close()
+
+    async def serve(self, host='127.0.0.1', port=8765, unix_path=None):
+        await self.warm_up()
+        dispatchers = [asyncio.create_task(self._dispatch()) for _ in range(self.workers)]
+        if unix_path:
+            server = await asyncio.start_unix_server(self._handle, path=unix_path)
+            print(f"Listening on {unix_path} ({self.workers} workers)")
+        else:
+            server = await asyncio.start_server(self._handle, host, port)
+            print(f"Listening on {host}:{port} ({self.workers} workers)")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            for task in dispatchers:
+                task.cancel()
+            self.pool.shutdown(cancel_futures=True)
+
+
+async def solve_remote(requests, host='127.0.0.1', port=8765, unix_path=None):
+    # クライアント側の簡易ヘルパー. 結果は id ごとに返る (送った順とは限らない)
+    if unix_path:
+        reader, writer = await asyncio.open_unix_connection(unix_path)
+    else:
+        reader, writer = await asyncio.open_connection(host, port)
+    for i, request in enumerate(requests):
+        request.setdefault('id', i)
+        writer.write((json.dumps(request) + '\n').encode())
+    await writer.drain()
+    results = {}
+    while len(results) < len(requests):
+        line = await reader.readline()
+        if not line:
+            break
+        response = json.loads(line)
+        results[response['id']] = response
+    writer.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local pentomino solve service")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--unix', help="Unix socket path (instead of TCP)")
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--cache', help="SQLite solution cache path")
+    parser.add_argument('--library', help="Placement library path (built with library.py)")
+    args = parser.parse_args()
+    service = SolveService(args.workers, args.cache, args.library)
+    asyncio.run(service.serve(args.host, args.port, args.unix))
+
+
+if __name__ == "__main__":
+    main()
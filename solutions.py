@@ -0,0 +1,144 @@
+import json
+import os
+import struct
+import zlib
+from array import array
+
+# 全解の列挙結果を小さく保存するファイル形式
+# 1つの解は「ピースごとの option 番号 (placement_options[i] の何番目か = 向きと位置)」の uint16 列.
+# BLOCK 解ごとに zlib で圧縮して書き足し, 最後にブロックの索引を書くので,
+# 書き込み中も読み出し中もメモリはブロック1つ分で済む
+#
+# ファイル形式: MAGIC, uint32 (ヘッダJSONの長さ), ヘッダJSON, 圧縮ブロック列, 索引JSON,
+#               uint64 (索引の位置), uint64 (解の総数)
+# ヘッダ: n, 初期盤面, xans, yans, ピース形状, ピースごとの option の (rot, dx, dy) の表, ブロックの解数
+
+MAGIC = b'PENTSOL1'
+BLOCK = 65536
+
+
+class SolutionWriter:
+    def __init__(self, path, board, xans, yans, mats, placement_options, block=BLOCK):
+        self.path = path
+        self.num_pieces = len(placement_options)
+        self.block = block
+        self.buffer = array('H')
+        self.pending = 0  # buffer に溜まっている解の数 (ピース0個でも数えられるように別に持つ)
+        self.index = []  # ブロックごとの [オフセット, 解の数]
+        self.total = 0
+        header = json.dumps({
+            'n': len(board),
+            'board': board,
+            'xans': list(xans),
+            'yans': list(yans),
+            'mats': [[list(p) for p in mat.positions] for mat in mats],
+            'options': [[[opt['rot'], opt['dx'], opt['dy']] for opt in options] for options in placement_options],
+            'block': block,
+        }).encode()
+        self.file = open(path + '.tmp', 'wb')
+        self.file.write(MAGIC)
+        self.file.write(struct.pack('<I', len(header)))
+        self.file.write(header)
+
+    def add(self, choices):
+        self.buffer.extend(choices)
+        self.total += 1
+        self.pending += 1
+        if self.pending >= self.block:
+            self._flush()
+
+    def _flush(self):
+        if not self.pending:
+            return
+        self.index.append([self.file.tell(), self.pending])
+        self.file.write(zlib.compress(self.buffer.tobytes()))
+        self.buffer = array('H')
+        self.pending = 0
+
+    def close(self):
+        # 索引を書いてから置き換える (途中で落ちたら .tmp が残るだけ)
+        self._flush()
+        index_offset = self.file.tell()
+        self.file.write(json.dumps(self.index).encode())
+        self.file.write(struct.pack('<QQ', index_offset, self.total))
+        self.file.close()
+        os.replace(self.path + '.tmp', self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        if exc[0] is None:
+            self.close()
+        else:
+            self.file.close()
+
+
+class SolutionFile:
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, 'rb')
+        if self.file.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a solution file")
+        (length,) = struct.unpack('<I', self.file.read(4))
+        self.header = json.loads(self.file.read(length))
+        self.n = self.header['n']
+        self.num_pieces = len(self.header['options'])
+        self.file.seek(-16, os.SEEK_END)
+        end = self.file.tell()
+        index_offset, self.total = struct.unpack('<QQ', self.file.read(16))
+        self.file.seek(index_offset)
+        self.index = json.loads(self.file.read(end - index_offset))
+        # ブロック k の圧縮データは index[k][0] から次のブロック (最後は索引) の手前まで
+        self.ends = [offset for offset, count in self.index[1:]] + [index_offset]
+        self.cached = (None, None)
+
+    def close(self):
+        self.file.close()
+
+    def __len__(self):
+        return self.total
+
+    def _block(self, k):
+        if self.cached[0] != k:
+            offset = self.index[k][0]
+            self.file.seek(offset)
+            data = array('H')
+            data.frombytes(zlib.decompress(self.file.read(self.ends[k] - offset)))
+            self.cached = (k, data)
+        return self.cached[1]
+
+    def choices(self, i):
+        # i 番目の解の option 番号のリスト
+        if not 0 <= i < self.total:
+            raise IndexError(i)
+        block = self.header['block']
+        start = (i % block) * self.num_pieces
+        return self._block(i // block)[start:start + self.num_pieces].tolist()
+
+    def __iter__(self):
+        for k, (offset, count) in enumerate(self.index):
+            data = self._block(k)
+            for j in range(count):
+                yield data[j * self.num_pieces:(j + 1) * self.num_pieces].tolist()
+
+    def placements(self, i):
+        # i 番目の解の各ピースの (rot, dx, dy) (Table.placements と同じ形)
+        return [tuple(self.header['options'][piece][k]) for piece, k in enumerate(self.choices(i))]
+
+    def table(self, i):
+        # i 番目の解を書き込んだ Table (Table.eval が解を書き込むのと同じラベル付け)
+        from main import Table, Material
+
+        table = Table(self.header['board'])
+        for piece, (rot, dx, dy) in enumerate(self.placements(i)):
+            for px, py in Material([tuple(p) for p in self.header['mats'][piece]]).rotate(rot).positions:
+                table.set(px + dx, py + dy, piece + 2)
+        table.placements = self.placements(i)
+        return table
+
+    def board(self, i):
+        return self.table(i).tolist()
+
+    def visualize(self, i, show=True):
+        return self.table(i).visualize(self.header['xans'], self.header['yans'], show=show)
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# ソルバーはリポジトリ直下のモジュール (main.py, kernel.py, ...) なので直下を import パスに入れる
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,172 @@
+import io
+import os
+import random
+from contextlib import redirect_stdout
+
+import pytest
+
+import kernel
+import solutions
+import transfer
+import main
+from main import Table, Material
+
+MATS = [
+    Material([(0, 0), (0, 1), (1, 1)]),
+    Material([(0, 0), (1, 0), (1, 1), (2, 0)]),
+    Material([(0, 0), (1, 0), (2, 0), (2, -1)]),
+    Material([(0, 0), (1, 0), (1, 1), (2, 1)]),
+    Material([(0, 0), (1, 0), (0, 1), (1, 1)]),
+    Material([(0, 0), (1, 0)]),
+    Material([(0, 0), (1, 0), (2, 0)]),
+]
+
+
+def random_instance(seed, solvable):
+    # ランダムな盤面/ピースと, ランダムな配置から作った目標 (solvable=False なら目標を1マスずらす)
+    rng = random.Random(seed)
+    while True:
+        n = rng.choice([4, 5, 6])
+        mats = [rng.choice(MATS) for _ in range(rng.randint(2, 5))]
+        table = Table(n)
+        for _ in range(rng.randint(0, 3)):
+            table.set(rng.randrange(n), rng.randrange(n), rng.choice([1, -1]))
+        with redirect_stdout(io.StringIO()):
+            placement_options = table.placement_options(mats)
+        if placement_options is None:
+            continue
+        mask = table.obstacle_mask
+        xans = table.x_counts[:]
+        yans = table.y_counts[:]
+        for options in placement_options:
+            free = [opt for opt in options if not mask & opt['mask']]
+            if not free:
+                break
+            opt = rng.choice(free)
+            mask |= opt['mask']
+            xans = [x + a for x, a in zip(xans, opt['x_adds'])]
+            yans = [y + a for y, a in zip(yans, opt['y_adds'])]
+        else:
+            if not solvable:
+                src = rng.choice([c for c in range(n) if xans[c] > table.x_counts[c]])
+                xans[src] -= 1
+                xans[rng.choice([c for c in range(n) if c != src])] += 1
+            return table, placement_options, xans, yans
+
+
+def dfs_count(n, placement_options, obstacle_mask, x_counts, y_counts, xans, yans):
+    # 異なる盤面の数を素朴な全探索で数える (transfer.count の検算用)
+    boards = set()
+    unique = [list({opt['mask']: opt for opt in options}.values()) for options in placement_options]
+
+    def rec(depth, mask, xs, ys, chosen):
+        if depth == len(unique):
+            if list(xs) == list(xans) and list(ys) == list(yans):
+                boards.add(tuple(chosen))
+            return
+        for opt in unique[depth]:
+            if mask & opt['mask']:
+                continue
+            nx = [x + a for x, a in zip(xs, opt['x_adds'])]
+            ny = [y + a for y, a in zip(ys, opt['y_adds'])]
+            if any(x > t for x, t in zip(nx, xans)) or any(y > t for y, t in zip(ny, yans)):
+                continue
+            rec(depth + 1, mask | opt['mask'], nx, ny, chosen + [opt['mask']])
+
+    rec(0, obstacle_mask, x_counts, y_counts, [])
+    return len(boards)
+
+
+@pytest.mark.parametrize('solvable', [True, False])
+@pytest.mark.parametrize('seed', range(15))
+def test_jit_matches_python(seed, solvable):
+    table, placement_options, xans, yans = random_instance(seed, solvable)
+    args = (placement_options, table.obstacle_mask, table.x_counts, table.y_counts, xans, yans)
+    with redirect_stdout(io.StringIO()):
+        expected = table._search_python(*args)
+    assert kernel.search(table.n, *args) == expected
+    if solvable:
+        assert expected[0] is not None
+
+
+@pytest.mark.parametrize('size, cells, xans, yans, found', [
+    (5, [], [5, 4, 3, 2, 1], [5, 4, 3, 2, 1], True),
+    (5, [], [1, 2, 3, 4, 5], [5, 4, 3, 2, 1], True),
+    (5, [(4, 0, -1), (0, 4, 1)], [5, 4, 3, 2, 2], [5, 4, 3, 2, 2], False),
+    (9, [], [2, 2, 2, 2, 2, 2, 1, 1, 1], [1, 1, 1, 2, 2, 2, 2, 2, 2], False),
+])
+def test_jit_matches_python_fixed(size, cells, xans, yans, found):
+    table = Table(size)
+    for x, y, val in cells:
+        table.set(x, y, val)
+    with redirect_stdout(io.StringIO()):
+        placement_options = table.placement_options(MATS[:4])
+        args = (placement_options, table.obstacle_mask, table.x_counts, table.y_counts, xans, yans)
+        expected = table._search_python(*args)
+    assert (expected[0] is not None) == found
+    assert kernel.search(size, *args) == expected
+
+
+@pytest.mark.parametrize('seed', range(15))
+def test_transfer_count_matches_dfs(seed):
+    table, placement_options, xans, yans = random_instance(seed, True)
+    args = (table.n, placement_options, table.obstacle_mask, table.x_counts, table.y_counts, xans, yans)
+    with redirect_stdout(io.StringIO()):
+        counted = transfer.count(*args)
+    assert counted == dfs_count(*args)
+    assert counted >= 1
+
+
+@pytest.mark.parametrize('engine', ['python', 'jit', 'auto', 'portfolio'])
+def test_no_pieces(engine):
+    # ピースが0個なら空の配置がそのまま解 (どのエンジンでも kernel.search と同じ ([], 1))
+    table = Table(3)
+    table.set(0, 0, 1)
+    args = ([], table.obstacle_mask, table.x_counts, table.y_counts, [1, 0, 0], [0, 0, 1])
+    with redirect_stdout(io.StringIO()):
+        assert table._search_python(*args) == kernel.search(3, *args) == ([], 1)
+        assert table.copy().eval([1, 0, 0], [0, 0, 1], [], engine=engine) is not None
+
+
+def test_no_pieces_checkpoint_and_enumerate(tmp_path):
+    table = Table(3)
+    table.set(0, 0, 1)
+    checkpoint = str(tmp_path / 'search.ckpt')
+    path = str(tmp_path / 'solutions.bin')
+    with redirect_stdout(io.StringIO()):
+        assert table.copy().eval([1, 0, 0], [0, 0, 1], [], checkpoint=checkpoint) is not None
+        assert table.enumerate_solutions([1, 0, 0], [0, 0, 1], [], path) == 1
+    assert not os.path.exists(checkpoint)
+    assert list(solutions.SolutionFile(path)) == [[]]
+
+
+@pytest.mark.parametrize('value_order', [None, 'deficit'])
+@pytest.mark.parametrize('seed, solvable', [(24, True), (17, False)])
+def test_checkpoint_resume(seed, solvable, value_order, tmp_path, monkeypatch):
+    # 3回目の保存の直後に止めてから再開しても, 止めずに探索したのと同じ (解, イテレーション数) になる
+    table, placement_options, xans, yans = random_instance(seed, solvable)
+    args = (placement_options, table.obstacle_mask, table.x_counts, table.y_counts, xans, yans)
+    checkpoint = str(tmp_path / 'search.ckpt')
+    save = main._save_checkpoint
+    saves = []
+
+    def save_then_stop(path, state):
+        save(path, state)
+        saves.append(state['iterations'])
+        if len(saves) == 3:
+            raise KeyboardInterrupt()
+
+    with redirect_stdout(io.StringIO()):
+        expected = table._search_python(*args, value_order=value_order)
+        monkeypatch.setattr(main, '_save_checkpoint', save_then_stop)
+        with pytest.raises(KeyboardInterrupt):
+            table._search_python(*args, checkpoint=checkpoint, checkpoint_interval=0, value_order=value_order)
+        monkeypatch.undo()
+    assert os.path.exists(checkpoint)
+    assert 1 < saves[-1] < expected[1]
+    log = io.StringIO()
+    with redirect_stdout(log):
+        resumed = table._search_python(*args, checkpoint=checkpoint, value_order=value_order)
+    assert f"Resumed from checkpoint: {saves[-1]:,} iterations" in log.getvalue()
+    assert resumed == expected
+    assert not os.path.exists(checkpoint)
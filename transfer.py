@@ -0,0 +1,99 @@
+# 解の個数を数える専用エンジン (行ごとの転送行列法)
+# 盤面を上の行から1マスずつ走査し, 各 option はそのマスクの最初のマス (ビット番号最小) に置くものとして扱う.
+# 状態 = (現在の行から下の, 既に置いたピースが占めるマス, 使ったピースの集合, 列ごとの合計).
+# 同じ状態は辞書でまとめて個数だけ持つので, 解を1つずつ作らずに数えられる.
+# 数えるのは異なる盤面 (ピースごとのラベル付き) の数. 回転対称なピースで同じマスクになる option は1つとみなす
+
+# 状態数の上限 (超えたら MemoryError)
+MAX_STATES = 2_000_000
+
+
+def _popcount(x):
+    return bin(x).count('1')
+
+
+def count(n, placement_options, obstacle_mask, x_counts, y_counts, xans, yans, max_states=None):
+    # returns 解の個数
+    if max_states is None:
+        max_states = MAX_STATES
+    num_pieces = len(placement_options)
+    all_used = (1 << num_pieces) - 1
+    row_bits = (1 << n) - 1
+
+    # 置き場所 (最初のマス) ごとの option: (ピース番号, 行頭からの相対マスク, x_adds)
+    at = [[] for _ in range(n * n)]
+    last_anchor = [-1] * num_pieces
+    for piece, options in enumerate(placement_options):
+        seen = set()
+        for opt in options:
+            mask = opt['mask']
+            if mask in seen:
+                continue
+            seen.add(mask)
+            anchor = (mask & -mask).bit_length() - 1
+            at[anchor].append((piece, mask >> (anchor // n * n), tuple(opt['x_adds'])))
+            last_anchor[piece] = max(last_anchor[piece], anchor)
+    # required[p]: 位置 p より前にしか置けないピース (p に来た時点で使っていなければ枝刈り)
+    required = [0] * (n * n + 1)
+    for p in range(n * n + 1):
+        for piece in range(num_pieces):
+            if last_anchor[piece] < p:
+                required[p] |= 1 << piece
+
+    # free_below[r][c]: r 行より下で列 c の障害物でないマス数
+    free_below = [[sum(1 for rr in range(r + 1, n) if not (obstacle_mask >> (rr * n + c)) & 1)
+                   for c in range(n)] for r in range(n)]
+    col_bits = [sum(1 << (rr * n + c) for rr in range(n)) for c in range(n)]
+
+    states = {(0, 0, tuple(x_counts)): 1}
+    peak = 1
+    for r in range(n):
+        row_obstacles = (obstacle_mask >> (r * n)) & row_bits
+        for c in range(n):
+            p = r * n + c
+            bit = 1 << c
+            if (row_obstacles & bit) or not at[p]:
+                continue
+            next_states = {}
+            for (occ, used, xs), ways in states.items():
+                # そのまま (このマスを最初のマスとするピースは置かない)
+                key = (occ, used, xs)
+                next_states[key] = next_states.get(key, 0) + ways
+                if occ & bit:
+                    continue
+                for piece, rel, adds in at[p]:
+                    if (used >> piece) & 1 or occ & rel:
+                        continue
+                    next_xs = tuple(x + a for x, a in zip(xs, adds))
+                    if any(x > t for x, t in zip(next_xs, xans)):
+                        continue
+                    key = (occ | rel, used | (1 << piece), next_xs)
+                    next_states[key] = next_states.get(key, 0) + ways
+            states = next_states
+            # 次の位置より前にしか置けないピースを使っていない状態を落とす
+            need = required[p + 1]
+            if need:
+                states = {key: ways for key, ways in states.items() if key[1] & need == need}
+            peak = max(peak, len(states))
+            if len(states) > max_states:
+                raise MemoryError(f"Transfer-matrix state limit exceeded ({len(states):,} > {max_states:,})")
+
+        # 行の確定: この行の合計をチェックして, 行をずらす
+        next_states = {}
+        for (occ, used, xs), ways in states.items():
+            if y_counts[r] + _popcount(occ & row_bits) != yans[r]:
+                continue
+            below = occ >> n
+            # 列の残り必要数が, 下の行の空きマスで埋められる数を超えたら枝刈り
+            shifted = below << ((r + 1) * n)
+            if any(xans[col] - xs[col] > free_below[r][col] - _popcount(shifted & col_bits[col])
+                   for col in range(n)):
+                continue
+            key = (below, used, xs)
+            next_states[key] = next_states.get(key, 0) + ways
+        states = next_states
+        print(f"[Progress] Transfer matrix: row {r + 1}/{n}, {len(states):,} states")
+
+    total = sum(ways for (occ, used, xs), ways in states.items() if used == all_used and list(xs) == list(xans))
+    print(f"[Progress] Transfer matrix complete. Solutions: {total:,} (Peak states: {peak:,})")
+    return total
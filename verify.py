@@ -0,0 +1,78 @@
+import numpy as np
+
+# 何百万枚の盤面をまとめて検査するときのチャンクサイズ (メモリ使用量の上限用)
+CHUNK = 65536
+
+
+def _shapes(mats):
+    # 各ピースの4回転ぶんの (dr, dc) オフセット (外接矩形の左上を原点にしたもの)
+    shapes = []
+    for mat in mats:
+        rotations = []
+        for k in range(4):
+            cells = [(-y, x) for x, y in mat.rotate(k).positions]
+            min_r = min(r for r, c in cells)
+            min_c = min(c for r, c in cells)
+            offsets = np.array(sorted(set((r - min_r, c - min_c) for r, c in cells)), dtype=np.intp)
+            rotations.append(offsets)
+        shapes.append(rotations)
+    return shapes
+
+
+def _verify_chunk(boards, initial, xans, yans, shapes):
+    num, n, _ = boards.shape
+    filled = boards > 0
+
+    # 行/列の合計 (yans は上の行から)
+    sums = ((filled.sum(axis=1) == xans).all(axis=1) &
+            (filled.sum(axis=2) == yans).all(axis=1))
+
+    # 初期盤面の 1/-1 (と既存ラベル) はそのまま, 空きマスには 0 かピースのラベルだけ
+    fixed = initial != 0
+    obstacles = (boards[:, fixed] == initial[fixed]).all(axis=1)
+    free = boards[:, ~fixed]
+    obstacles &= ((free == 0) | ((free >= 2) & (free < len(shapes) + 2))).all(axis=1)
+
+    # ラベル i+2 のマスが mats[i] のどれかの回転と一致するか
+    pieces = np.ones(num, dtype=bool)
+    rows = np.arange(num)
+    for i, rotations in enumerate(shapes):
+        cells = (boards == i + 2) & ~fixed
+        count_ok = cells.sum(axis=(1, 2)) == len(rotations[0])
+        any_row = cells.any(axis=2)
+        any_col = cells.any(axis=1)
+        top = any_row.argmax(axis=1)
+        left = any_col.argmax(axis=1)
+        matched = np.zeros(num, dtype=bool)
+        for offsets in rotations:
+            r = top[:, None] + offsets[:, 0]
+            c = left[:, None] + offsets[:, 1]
+            inside = ((r < n) & (c < n)).all(axis=1)
+            hit = cells[rows[:, None], np.minimum(r, n - 1), np.minimum(c, n - 1)].all(axis=1)
+            matched |= inside & hit
+        pieces &= count_ok & matched
+    return sums, obstacles, pieces
+
+
+def verify_boards(boards, initial_board, xans, yans, mats, details=False):
+    # boards: (枚数, n, n) の盤面 (Table.internal と同じく上の行から). 1枚なら (n, n) でもよい
+    # returns 各盤面が正しい解かどうかの bool 配列.
+    # details=True なら {'sums', 'obstacles', 'pieces', 'valid'} の各チェック結果を返す
+    boards = np.asarray(boards, dtype=np.int8)
+    if boards.ndim == 2:
+        boards = boards[None]
+    initial = np.asarray(initial_board, dtype=np.int8)
+    xans = np.asarray(xans)
+    yans = np.asarray(yans)
+    n = initial.shape[0]
+    if boards.shape[1:] != (n, n) or len(xans) != n or len(yans) != n:
+        raise ValueError(f"Shape mismatch: boards {boards.shape}, board size {n}")
+
+    shapes = _shapes(mats)
+    results = {key: np.empty(len(boards), dtype=bool) for key in ('sums', 'obstacles', 'pieces')}
+    for start in range(0, len(boards), CHUNK):
+        chunk = boards[start:start + CHUNK]
+        for key, value in zip(('sums', 'obstacles', 'pieces'), _verify_chunk(chunk, initial, xans, yans, shapes)):
+            results[key][start:start + len(chunk)] = value
+    results['valid'] = results['sums'] & results['obstacles'] & results['pieces']
+    return results if details else results['valid']